@@ -0,0 +1,243 @@
+# circuit.py
+import numpy as np
+import mode_solver
+import optimizer
+import fdtd_engine
+import result_store
+
+# S-parameter circuit layer
+# Every component is characterized once into S(wl): an (n_wl, P, P) complex
+# array over its named ports, either from the analytical models or from one
+# FDTD run, and kept in the result store. A netlist of instances and port
+# connections is then cascaded for all wavelengths at once, so a circuit
+# spectrum costs a few batched linear solves instead of one huge domain.
+#
+# Netlist (JSON-friendly):
+#   {"instances":   {"split": {"type": "Y-Branch", "angle_deg": 2, "len_um": 100}, ...},
+#    "connections": [["split.out1", "arm1.in"], ...],
+#    "ports":       {"in": "split.in", "out1": "arm1.out", ...}}
+# Instance dicts use the same keys as the design tab; 'material',
+# 'polarization' default to the circuit's own.
+
+WL_POINTS = 201
+WL_SPAN_UM = 0.1         # default sweep: centre wavelength +- span/2
+CIRCUIT_VERSION = 3      # bump when the S-matrix models change
+LOSSLESS_TYPES = ("Mirror", "Grating (Bragg)")   # models must give S^H S = I
+UNITARITY_TOL = 1e-9
+
+def component_ports(params):
+    t = params['type']
+    if t == "Y-Branch": return ["in", "out1", "out2"]
+    if t == "MMI (Splitter)": return ["in"] + [f"out{k+1}" for k in range(int(params.get('ports', 2)))]
+    return ["in", "out"]
+
+class SParams:
+    """ Wavelength-dependent scattering matrix; s[k, i, j] couples port j into port i """
+
+    def __init__(self, wl, s, ports):
+        self.wl = np.asarray(wl, dtype=float)
+        self.s = np.asarray(s, dtype=complex)
+        self.ports = list(ports)
+
+    def index(self, port):
+        return self.ports.index(port)
+
+    def transmission(self, to_port, from_port):
+        """ Power |S|^2 from one port to another over the sweep """
+        return np.abs(self.s[:, self.index(to_port), self.index(from_port)]) ** 2
+
+    def transmission_db(self, to_port, from_port):
+        return 10 * np.log10(np.maximum(self.transmission(to_port, from_port), 1e-30))
+
+    def unitarity_error(self):
+        """ max |S^H S - I| over the sweep (0 for a lossless block) """
+        gram = np.conj(np.swapaxes(self.s, 1, 2)) @ self.s
+        return float(np.abs(gram - np.eye(len(self.ports))).max())
+
+def default_wavelengths(center_wl=1.55, span_um=WL_SPAN_UM, points=WL_POINTS):
+    return np.linspace(center_wl - span_um / 2, center_wl + span_um / 2, points)
+
+def _propagation(n_eff, length_um, wl):
+    return np.exp(-2j * np.pi * n_eff * length_um / wl)
+
+def _bragg(comp, params, wl):
+    """ Uniform grating from coupled-mode theory. The FDTD grating widens the
+    core by half at each tooth; kappa is the square-wave Fourier term of that
+    n_eff step. Returns (r, t) amplitudes. """
+    width = float(params.get('width_um', mode_solver.DEFAULT_WIDTH_UM))
+    lam_b = float(params.get('target_wl', 1.55))
+    period = lam_b / (2 * comp.effective_index(lam_b, width))
+    length = int(params.get('periods', 200)) * period
+    dn = comp.effective_index(lam_b, 1.5 * width) - comp.effective_index(lam_b, width)
+    kappa = 2 * dn / lam_b
+    delta = 2 * np.pi * comp.effective_index(wl, width) / wl - np.pi / period
+    gamma = np.sqrt(kappa ** 2 - delta ** 2 + 0j)
+    den = gamma * np.cosh(gamma * length) + 1j * delta * np.sinh(gamma * length)
+    r = -1j * kappa * np.sinh(gamma * length) / den
+    t = gamma / den * np.exp(-1j * np.pi * length / period)
+    return r, t
+
+def _model_sparams(params, wl):
+    """ S(wl) from the analytical models: amplitude from their transmittance,
+    phase from the mode solver n_eff over the device length """
+    t_type = params['type']
+    ports = component_ports(params)
+    s = np.zeros((len(wl), len(ports), len(ports)), dtype=complex)
+    pol = params.get('polarization', 'TM')
+    for k, w in enumerate(wl):
+        comp = optimizer._create_component(t_type, params['material'], w, pol)
+        if comp is None or not comp.is_transparent(w): continue
+        width = float(params.get('width_um', mode_solver.DEFAULT_WIDTH_UM))
+        if t_type == "Straight Guide":
+            length = float(params.get('len_um', 1000.0))
+            out = [comp.design(length, width)["Transmittance (%)"]]
+        elif t_type == "S-Bend":
+            offset, length = float(params.get('offset_um', 50.0)), float(params.get('len_um', 200.0))
+            out = [comp.design(offset, length)["Transmittance (%)"]]
+            length = np.hypot(length, offset)
+        elif t_type == "Y-Branch":
+            length = float(params.get('len_um', 100.0))
+            out = [comp.design(float(params.get('angle_deg', 2.0)), length)["Transmittance/port (%)"]] * 2
+        elif t_type == "MMI (Splitter)":
+            n = int(params.get('ports', 2))
+            design = optimizer._create_component(t_type, params['material'], 1.55, pol).design(width, n)
+            length = design["Device Length (um)"]
+            out = [comp.analyze_spectrum({'width_um': width, 'ports': n}, w)] * n
+        elif t_type == "Mirror":
+            R = float(params.get('reflectivity', 0.9))
+            # Lossless reciprocal two-port: t in quadrature with r
+            s[k, 0, 0] = s[k, 1, 1] = np.sqrt(R)
+            s[k, 0, 1] = s[k, 1, 0] = 1j * np.sqrt(1 - R)
+            continue
+        elif t_type == "Grating (Bragg)":
+            r, t = _bragg(comp, params, w)
+            s[k, 0, 0] = s[k, 1, 1] = r
+            s[k, 0, 1] = s[k, 1, 0] = t
+            continue
+        else:
+            continue
+        phase = _propagation(comp.effective_index(w, width), length, w)
+        for j, pct in enumerate(out, start=1):
+            s[k, j, 0] = s[k, 0, j] = np.sqrt(pct / 100.0) * phase   # reciprocal
+    sp = SParams(wl, s, ports)
+    live = np.abs(s).reshape(len(wl), -1).any(axis=1)   # opaque wavelengths are all zero
+    if t_type in LOSSLESS_TYPES and live.any():
+        err = SParams(wl[live], s[live], ports).unitarity_error()
+        if err > UNITARITY_TOL:
+            raise ValueError(f"{t_type} S-matrix is not energy conserving (|S^H S - I| = {err:.2e})")
+    return sp
+
+def _fdtd_sparams(params, wl, progress=None):
+    """ S(wl) with the forward magnitudes taken from one FDTD run. Only the
+    pulse-averaged flux transmission per port is trusted; it is applied across
+    the sweep and the phase (and any reflection) comes from the analytical
+    model. Lossless blocks keep their model S, since one port power cannot
+    fix r and t together. """
+    sp = _model_sparams(params, wl)
+    if params['type'] in LOSSLESS_TYPES: return sp
+    engine = fdtd_engine.FDTDEngine(dict(params, symmetry=True))
+    engine.run(progress=progress)
+    transmission = engine.port_transmission()
+    power = np.array([max(transmission.get(label, 0.0), 0.0) / 100.0 for label, _, _ in engine.ports])
+    if power.sum() > 1: power /= power.sum()    # monitor noise must not create energy
+    for j, p in enumerate(power, start=1):
+        phase = np.exp(1j * np.angle(sp.s[:, j, 0]))
+        sp.s[:, j, 0] = sp.s[:, 0, j] = np.sqrt(p) * phase
+    return sp
+
+def _sparams_key(params, wl, source):
+    version = fdtd_engine.ENGINE_VERSION if source == "fdtd" else optimizer.MODEL_VERSION
+    return result_store.make_key({"kind": "sparams", "source": source, "circuit": CIRCUIT_VERSION,
+                                  "version": version, "modes": mode_solver.TABLE_VERSION, "params": params,
+                                  "wl": [float(wl[0]), float(wl[-1]), len(wl)]})
+
+_memory = {}
+
+def characterize(params, wl=None, source="model", store=None, progress=None):
+    """ SParams of one component over wl, computed once per parameter set.
+    source is "model" (analytical) or "fdtd" (one run on the 300x200 grid). """
+    wl = default_wavelengths(float(params.get('wl', 1.55))) if wl is None else np.asarray(wl, dtype=float)
+    params = {k: v for k, v in params.items() if k != 'view_mode'}
+    key = _sparams_key(params, wl, source)
+    if key in _memory: return _memory[key]
+
+    cached = store.get(key) if store else None
+    if cached:
+        arrays, meta = cached
+        sp = SParams(arrays["wavelength"], arrays["s_real"] + 1j * arrays["s_imag"], meta["ports"])
+    else:
+        sp = _fdtd_sparams(params, wl, progress) if source == "fdtd" else _model_sparams(params, wl)
+        if not np.isfinite(sp.s).all():
+            raise ValueError(f"{params['type']} ({source}) produced a non-finite S-matrix")
+        if store:
+            try:
+                store.put(key, {"wavelength": sp.wl, "s_real": sp.s.real, "s_imag": sp.s.imag},
+                          {"ports": sp.ports, "params": params, "source": source}, kind="sparams",
+                          type=params['type'], material=params.get('material', ''),
+                          polarization=params.get('polarization', ''))
+            except result_store.STORE_ERRORS:
+                pass
+    _memory[key] = sp
+    return sp
+
+def cascade(blocks, connections, external):
+    """ Connects component S-matrices into one.
+    blocks: {name: SParams} on a common wavelength grid
+    connections: pairs of "inst.port" strings joined to each other
+    external: {circuit port: "inst.port"}, in output order
+    With all ports stacked, b = S a and a_int = C b_int, giving
+    S_ext = S_ee + S_ei (I - C S_ii)^-1 C S_ie for every wavelength. """
+    names, offset = {}, 0
+    for inst, sp in blocks.items():
+        for p in sp.ports:
+            names[f"{inst}.{p}"] = offset + sp.index(p)
+        offset += len(sp.ports)
+    wl = next(iter(blocks.values())).wl
+    S = np.zeros((len(wl), offset, offset), dtype=complex)
+    pos = 0
+    for sp in blocks.values():
+        n = len(sp.ports)
+        S[:, pos:pos + n, pos:pos + n] = sp.s
+        pos += n
+
+    ext = [names[p] for p in external.values()]
+    inner = [names[p] for pair in connections for p in pair]
+    if len(set(inner)) != len(inner) or set(inner) & set(ext):
+        raise ValueError("each port may be connected or exposed only once")
+    C = np.zeros((len(inner), len(inner)))
+    local = {p: i for i, p in enumerate(inner)}
+    for a, b in connections:
+        C[local[names[a]], local[names[b]]] = C[local[names[b]], local[names[a]]] = 1.0
+
+    S_ee = S[:, ext][:, :, ext]
+    S_ei = S[:, ext][:, :, inner]
+    S_ie = S[:, inner][:, :, ext]
+    S_ii = S[:, inner][:, :, inner]
+    if not inner: return SParams(wl, S_ee, list(external))
+    lhs = np.eye(len(inner)) - C @ S_ii
+    s = S_ee + S_ei @ np.linalg.solve(lhs, C @ S_ie)
+    return SParams(wl, s, list(external))
+
+class Circuit:
+    def __init__(self, netlist, material, polarization="TM", wl=None, source="model", store=None):
+        self.netlist = netlist
+        self.material = material
+        self.polarization = polarization
+        self.wl = default_wavelengths() if wl is None else np.asarray(wl, dtype=float)
+        self.source = source
+        self.store = store
+
+    def instance_params(self, name):
+        params = dict(self.netlist["instances"][name])
+        params.setdefault('material', self.material)
+        params.setdefault('polarization', self.polarization)
+        return params
+
+    def simulate(self, progress=None):
+        """ SParams between the circuit's external ports """
+        names = list(self.netlist["instances"])
+        blocks = {}
+        for k, name in enumerate(names):
+            if progress: progress(k, len(names))
+            blocks[name] = characterize(self.instance_params(name), self.wl, self.source, self.store)
+        return cascade(blocks, self.netlist.get("connections", []), self.netlist["ports"])
\ No newline at end of file
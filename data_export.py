@@ -0,0 +1,64 @@
+# data_export.py
+import json
+import datetime
+import numpy as np
+
+# Headless export of FDTD runs
+# A run is a dict of named arrays (input/output traces, detectors, spectra)
+# plus a metadata dict. Both writers do a single bulk write per file/chunk,
+# so they can be called from scripts without the GUI.
+
+CSV_CHUNK_ROWS = 65536
+CSV_FORMAT = "%.10g"
+
+def _as_arrays(traces):
+    return {name: np.asarray(data, dtype=float) for name, data in traces.items()}
+
+def build_metadata(params, **extra):
+    meta = {"date": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "params": {k: v for k, v in params.items()}}
+    meta.update(extra)
+    return meta
+
+def export_npz(path, traces, metadata):
+    """ Writes every array plus JSON metadata into one uncompressed .npz.
+    The file is opened here, so np.savez cannot append ".npz" to another
+    extension and the returned path is the file actually written. """
+    arrays = _as_arrays(traces)
+    with open(path, "wb") as f:
+        np.savez(f, __metadata__=np.array(json.dumps(metadata, default=str)), **arrays)
+    return path
+
+def load_npz(path):
+    with np.load(path) as data:
+        metadata = json.loads(str(data["__metadata__"]))
+        traces = {k: data[k] for k in data.files if k != "__metadata__"}
+    return traces, metadata
+
+def export_csv(path, traces, metadata, chunk_rows=CSV_CHUNK_ROWS):
+    """ Writes the 1D traces as columns (TimeStep first). Each chunk is
+    formatted by one %-operation on a repeated row format, which avoids the
+    per-row Python loop of np.savetxt. Shorter traces are padded with NaN;
+    2D arrays are skipped. """
+    columns = {k: v for k, v in _as_arrays(traces).items() if v.ndim == 1}
+    n_rows = max((len(v) for v in columns.values()), default=0)
+    table = np.full((n_rows, len(columns) + 1), np.nan)
+    table[:, 0] = np.arange(n_rows)
+    for j, v in enumerate(columns.values(), start=1):
+        table[:len(v), j] = v
+
+    with open(path, 'w') as f:
+        for k, v in metadata.items():
+            f.write(f"# {k}: {json.dumps(v, default=str) if isinstance(v, (dict, list)) else v}\n")
+        f.write(",".join(["TimeStep"] + list(columns)) + "\n")
+        row_fmt = ",".join([CSV_FORMAT] * table.shape[1]) + "\n"
+        for start in range(0, n_rows, chunk_rows):
+            chunk = table[start:start + chunk_rows]
+            f.write((row_fmt * len(chunk)) % tuple(chunk.ravel()))
+    return path
+
+def export_run(path, traces, metadata):
+    """ Picks the writer from the file extension (.npz or .csv) """
+    if str(path).lower().endswith(".csv"):
+        return export_csv(path, traces, metadata)
+    return export_npz(path, traces, metadata)
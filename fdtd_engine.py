@@ -0,0 +1,465 @@
+# fdtd_engine.py
+import warnings
+import numpy as np
+import materials
+import mode_solver
+import data_export
+
+# Headless 2D FDTD engine (NumPy only)
+# TM: MainField = Ez, Comp1 = Hx, Comp2 = Hy
+# TE: MainField = Hz, Comp1 = Ex, Comp2 = Ey
+# The GUI (fdtd_sim.FDTDWindow) drives step() from its animation; scripts
+# can call run() directly.
+
+# Bump whenever a change alters simulation results (invalidates stored runs)
+ENGINE_VERSION = 7
+
+# Designs drawn mirror-symmetric about the plane between rows mid_y-1 and
+# mid_y. With symmetry on, only rows >= mid_y are simulated plus one ghost
+# row holding the mirror image of mid_y, so MainField is even about the plane:
+#   TM: Ez even -> Hx = 0 on the plane (magnetic wall)
+#   TE: Hz even -> Ex = 0 on the plane (electric wall)
+SYMMETRIC_TYPES = ("Straight Guide", "MMI (Splitter)", "Grating (Bragg)", "Y-Branch")
+
+MONITOR_MARGIN = 3.0    # flux line half-span, in guide half-widths
+# Absorbing sponge on the outer walls: kappa grows as (depth/width)^2 up to
+# SPONGE_KAPPA, so pulses leave the box instead of bouncing back through the
+# flux monitors. It stays clear of the source (x = 30) and the output line
+# (x = size_x - 30); the symmetry plane gets none.
+SPONGE_CELLS = 20
+SPONGE_KAPPA = 0.3
+# Radiation-loss emulation for tight S-Bends / wide Y-Branches, as a loss
+# coefficient kappa = sigma*dt/(2*eps) on the core cells of the bent section
+# (gives the former 0.995 per-step damping there)
+EXCESS_LOSS_KAPPA = 0.0025
+# Progressive preview: the same design on a grid coarsened by this factor.
+# Cells are c x c block averages and each coarse step spans c fine steps
+# (same Courant number): 1/c^2 of the cells for 1/c of the steps, about 1/6
+# of a full run at c = 2 once the per-step overhead is counted.
+PREVIEW_FACTOR = 2
+# The preview is only offered when the coarse grid keeps at least this many
+# cells per wavelength in the core (SiO2 and polymer cores at c = 2). That is
+# enough for the field pattern, not for the port powers: they come out
+# 15-75 points off the full run
+PREVIEW_MIN_CELLS = 3.0
+# Below this many cells per wavelength in the core the guide leaks and its
+# port powers are unreliable (Si: 2.9, InP: 3.2, LiNbO3: 4.5, Si3N4: 5.0).
+# Runs still go ahead, with a warning.
+MIN_CELLS_PER_WAVELENGTH = 6.0
+
+# Source waveforms, vectorized over the fine-grid time step t. Each run
+# evaluates one table of amplitudes up front; step() only indexes it.
+# The carrier period is 20 steps (vacuum wavelength 10 cells at dt = 0.5).
+SOURCE_PERIOD = 20
+
+def gaussian_pulse(t):
+    t0, spread = 40, 12
+    return np.exp(-0.5 * ((t - t0) / spread) ** 2) * np.sin(2 * np.pi * t / SOURCE_PERIOD)
+
+def cw_ramp(t):
+    # Continuous wave switched on over 3 periods (raised cosine)
+    ramp = 3 * SOURCE_PERIOD
+    envelope = np.where(t < ramp, 0.5 * (1 - np.cos(np.pi * np.minimum(t, ramp) / ramp)), 1.0)
+    return envelope * np.sin(2 * np.pi * t / SOURCE_PERIOD)
+
+def chirp(t):
+    # Longer pulse whose frequency sweeps +-20% of the carrier across the envelope
+    t0, spread = 90, 30
+    f0 = 1.0 / SOURCE_PERIOD
+    rate = 0.2 * f0 / (3 * spread)
+    return np.exp(-0.5 * ((t - t0) / spread) ** 2) * np.sin(2 * np.pi * (f0 * (t - t0) + 0.5 * rate * (t - t0) ** 2))
+
+WAVEFORMS = {"Gaussian pulse": gaussian_pulse, "CW ramp": cw_ramp, "Chirp": chirp}
+SOURCE_PROFILES = ("Point", "Line", "Mode profile")
+
+class FDTDEngine:
+    def __init__(self, params, detectors=None, coarsen=1):
+        self.params = params
+        self.coarsen = int(coarsen)
+        # Shared with the GUI: dicts with 'label', 'x', 'y', 'active', 'data'
+        self.detectors = detectors if detectors is not None else []
+        self.parse_params()
+        self.reset()
+        if self.coarsen == 1 and not self.resolved():
+            warnings.warn(f"{self.material or 'core'}: {self.core_wavelength_cells():.1f} cells per wavelength "
+                          f"(< {MIN_CELLS_PER_WAVELENGTH:.0f}), port powers are unreliable", stacklevel=2)
+
+    def parse_params(self):
+        p = self.params
+        self.guide_type = p['type']
+        self.pol_mode = p.get('polarization', 'TM')
+        self.real_width = float(p.get('width_um', 2.0))
+        self.real_angle = float(p.get('angle_deg', 2.0))
+        self.real_offset = float(p.get('offset_um', 5.0))
+        self.n_ports = int(p.get('ports', 2))
+        self.material = p.get('material')
+        self.center_wl = float(p.get('wl', 1.55))
+
+        self.size_x = 300
+        self.size_y = 200
+        self.default_steps = int(self.size_x * 5)
+
+        self.mid_y = self.size_y // 2
+        self.src_x, self.src_y = 30, self.mid_y
+        self.def_out_x, self.def_out_y = self.size_x - 30, self.mid_y
+        if self.size_x % self.coarsen or self.mid_y % self.coarsen:
+            raise ValueError(f"grid {self.size_x}x{self.size_y} cannot be coarsened by {self.coarsen}")
+
+    def reset(self):
+        # Geometry is always built on the full grid (also used for display)
+        self.epsilon = np.ones((self.size_x, self.size_y)) * 1.0
+        self.build_geometry()
+        eps, kappa = self.epsilon, self.kappa
+        if self.coarsen > 1:
+            # kappa is per step, and a coarse step lasts c fine steps
+            eps, kappa = self._downsample(eps), self.coarsen * self._downsample(kappa)
+        self.setup_symmetry()
+
+        eps, kappa = eps[:, self.y_lo:], kappa[:, self.y_lo:]
+        self.MainField = np.zeros(eps.shape)
+        self.Comp1 = np.zeros(eps.shape)
+        self.Comp2 = np.zeros(eps.shape)
+
+        # Update coefficients with the conductivity folded in:
+        # E = C_decay * E + C_inv * curl(H)
+        # C_decay is 1 on lossless cells, so step() only scales the listed
+        # lossy cells (flat indices) before the usual E += C_inv * curl(H)
+        self.C_inv = 0.5 / eps / (1 + kappa)
+        self.C_decay = (1 - kappa) / (1 + kappa)
+        self._loss_cells = np.flatnonzero(kappa > 0)
+        self._loss_decay = self.C_decay.ravel()[self._loss_cells]
+        self.build_monitors()
+        self.build_source()
+
+        self.steps_done = 0
+        self.history_out_default = []
+        self.flux_history = []
+        for d in self.detectors:
+            d['data'] = []
+
+    def build_geometry(self):
+        SCALE = 10.0
+        p_width = self.real_width
+        sim_epsilon_val = 2.25
+        if self.material in materials.MATERIALS_DB:
+            sim_epsilon_val = materials.get_refractive_index(self.material, self.center_wl) ** 2
+
+        # Narrow guides: reduce the index contrast instead of the pixel width
+        if p_width < 1.5: sim_epsilon_val = 1.05 + (sim_epsilon_val - 1.05) * (p_width / 1.5)
+        # High-index cores slow the pulse down: give it time to reach the output
+        self.default_steps = int(self.size_x * 5 * max(1.0, np.sqrt(sim_epsilon_val) / 1.5))
+        excess = None   # x-range of the section with excess radiation loss
+
+        def draw_rect(y, w, start=0, end=None):
+            if end is None: end = self.size_x
+            self.epsilon[start:end, y-w:y+w] = sim_epsilon_val
+
+        w_px = 6
+        # Output ports as (label, centre y, half-width) for the flux monitors
+        self.ports = [("Out", self.mid_y, w_px)]
+        self.port_spacing = None
+
+        if self.guide_type == "Straight Guide":
+            draw_rect(self.mid_y, w_px)
+
+        elif self.guide_type == "S-Bend":
+            bend_len = 120; offset = 30; start_x = 30
+            if self.real_offset > 20: excess = slice(start_x, start_x + bend_len)
+            draw_rect(self.mid_y, w_px, 0, start_x)
+            for i in range(start_x, start_x + bend_len):
+                if i >= self.size_x: break
+                u = (i - start_x) / bend_len
+                s = 0.5 * (1 - np.cos(np.pi * u))
+                cy = int(self.mid_y + s * offset)
+                self.epsilon[i, cy-w_px:cy+w_px] = sim_epsilon_val
+            draw_rect(self.mid_y+offset, w_px, start_x+bend_len, self.size_x)
+            self.def_out_y = self.mid_y + offset
+            self.ports = [("Out", self.mid_y + offset, w_px)]
+
+        elif self.guide_type == "Y-Branch":
+            draw_rect(self.mid_y, w_px, 0, 50)
+            slope = 0.3
+            if self.real_angle > 10: excess = slice(50, self.size_x)
+            for i in range(50, self.size_x):
+                shift = int((i - 50) * slope)
+                if self.mid_y+shift+6 < self.size_y: self.epsilon[i, self.mid_y+shift-6:self.mid_y+shift+6] = sim_epsilon_val
+                if self.mid_y-shift-6 > 0:      self.epsilon[i, self.mid_y-shift-6:self.mid_y-shift+6] = sim_epsilon_val
+            self.def_out_y = self.mid_y + int((self.size_x - 70) * slope)
+            shift = int((self.def_out_x - 50) * slope)
+            self.ports = [("Out 1", self.mid_y + shift, 6), ("Out 2", self.mid_y - shift, 6)]
+
+        elif self.guide_type == "MMI (Splitter)":
+            draw_rect(self.mid_y, 5, 0, 40)
+            vis_w = 20 if self.n_ports > 2 else 12
+            draw_rect(self.mid_y, vis_w, 40, 140)
+            out_spacing = 15
+            self.ports = []
+            self.port_spacing = out_spacing
+            for k in range(self.n_ports):
+                # Round the offset away from the axis so port k and its mirror
+                # n-1-k are mirror images (cores centred at oy - 0.5)
+                d = (k - (self.n_ports - 1) / 2) * out_spacing
+                oy = self.mid_y + int(np.sign(d) * int(abs(d) + 0.5))
+                self.epsilon[140:, oy-5:oy+5] = sim_epsilon_val
+                if k==0: self.def_out_y = oy
+                self.ports.append((f"Out {k+1}", oy, 5))
+
+        elif self.guide_type == "Grating (Bragg)":
+            draw_rect(self.mid_y, w_px)
+            for i in range(60, 160, 15):
+                self.epsilon[i:i+6, self.mid_y-9:self.mid_y+9] = sim_epsilon_val
+        else:
+            draw_rect(self.mid_y, w_px)
+
+        self.build_loss_map(SCALE, excess)
+
+    def build_loss_map(self, px_per_um, excess=None):
+        """ Per-cell kappa = sigma*dt/(2*eps). Core cells absorb with the
+        material's alpha (dB/cm); the vacuum cladding is lossless apart from
+        the sponge along the outer walls. """
+        self.kappa = np.zeros_like(self.epsilon)
+        core = self.epsilon > 1.0
+        props = materials.get_properties(self.material)
+        if props:
+            alpha_cell = props["alpha"] / (20 * np.log10(np.e)) * 1e-4 / px_per_um   # Np per cell
+            # Amplitude attenuation alpha = sigma / (2n) with dt = 0.5 -> kappa = alpha / (2n)
+            self.kappa[core] = alpha_cell / (2 * np.sqrt(self.epsilon[core]))
+        if excess is not None:
+            self.kappa[excess][core[excess]] += EXCESS_LOSS_KAPPA
+        depth = np.arange(SPONGE_CELLS, 0, -1) / SPONGE_CELLS   # 1 at the wall
+        ramp = SPONGE_KAPPA * depth ** 2
+        self.kappa[:SPONGE_CELLS] += ramp[:, None]
+        self.kappa[-SPONGE_CELLS:] += ramp[::-1, None]
+        self.kappa[:, :SPONGE_CELLS] = np.maximum(self.kappa[:, :SPONGE_CELLS], ramp[None, :])
+        self.kappa[:, -SPONGE_CELLS:] = np.maximum(self.kappa[:, -SPONGE_CELLS:], ramp[None, ::-1])
+
+    def _downsample(self, a):
+        c = self.coarsen
+        return a.reshape(a.shape[0] // c, c, a.shape[1] // c, c).mean(axis=(1, 3))
+
+    def setup_symmetry(self):
+        """ Chooses the simulated cells. x_map / y_map take a full-grid
+        column / row to its simulated index; with symmetry local row 0 is
+        the ghost (mirror of mid_y) and rows below the plane map onto their
+        mirror. All positions (source, ports, detectors) stay in full-grid
+        coordinates and go through these maps. """
+        # Only when the built maps really are mirror images about the plane
+        self.symmetric = (bool(self.params.get('symmetry', True)) and self.src_y == self.mid_y
+                          and self.guide_type in SYMMETRIC_TYPES
+                          and np.array_equal(self.epsilon, self.epsilon[:, ::-1])
+                          and np.array_equal(self.kappa, self.kappa[:, ::-1]))
+        mid = self.mid_y // self.coarsen
+        y = np.arange(self.size_y) // self.coarsen
+        if self.symmetric:
+            self.y_lo = mid - 1
+            self.y_map = np.where(y >= mid, y - mid + 1, mid - y)
+        else:
+            self.y_lo = 0
+            self.y_map = y
+        self.x_map = np.arange(self.size_x) // self.coarsen
+
+    def full_field(self):
+        """ MainField on the full grid (mirrored back / upsampled as needed) """
+        if self.coarsen == 1 and not self.symmetric: return self.MainField
+        return self.MainField[np.ix_(self.x_map, self.y_map)]
+
+    def build_monitors(self):
+        """ Flux lines across the input guide and every output port.
+        All monitor cells are flattened into one index set so the Poynting
+        flux of every line is one gather + np.add.reduceat per step. """
+        # The input line spans the whole cross-section inside the sponge, so its
+        # forward flux is all the power the source launches towards the device
+        lines = [("In", self.src_x + 20, self.mid_y, (self.size_y - 2 * SPONGE_CELLS) // 2)]
+        lines += [(label, self.def_out_x, y, hw) for label, y, hw in self.ports]
+
+        self.monitors = []
+        xs, ys, offsets = [], [], []
+        for k, (label, x, y, hw) in enumerate(lines):
+            half = MONITOR_MARGIN * hw if k else hw
+            if self.port_spacing and k: half = min(half, self.port_spacing / 2)
+            # The core spans rows y-hw .. y+hw-1: centre the line on it so
+            # mirrored ports get mirrored row sets
+            y0, y1 = max(y - int(half), 1), min(y + int(half), self.size_y - 1)
+            offsets.append(len(xs))
+            xs.extend([x] * (y1 - y0)); ys.extend(range(y0, y1))
+            self.monitors.append({'label': label, 'x': x, 'y0': y0, 'y1': y1})
+        self._mon_x = self.x_map[np.array(xs, dtype=int)]
+        self._mon_y = self.y_map[np.array(ys, dtype=int)]
+        self._mon_offsets = np.array(offsets)
+        # Wave impedance 1/n of the input line cells, to split off its forward wave
+        self._in_n = np.sqrt(self.epsilon[xs[:offsets[1]], ys[:offsets[1]]])
+
+    def sample_flux(self):
+        """ Poynting flux S_x through each monitor line (E and H averaged onto
+        the E node). The input line reports only its forward (+x) wave, so
+        light reflected by the device does not reduce the reference. """
+        xs, ys = self._mon_x, self._mon_y
+        if self.pol_mode == 'TM':   # S_x = -Ez * Hy
+            e, h = self.MainField[xs, ys], -0.5 * (self.Comp2[xs - 1, ys] + self.Comp2[xs, ys])
+        else:                       # S_x = Ey * Hz
+            e, h = self.Comp2[xs, ys], 0.5 * (self.MainField[xs - 1, ys] + self.MainField[xs, ys])
+        flux = np.add.reduceat(e * h, self._mon_offsets)
+        # A +x wave has h = n e: forward amplitude (e + h/n)/2, power n * that^2
+        n, k = self._in_n, len(self._in_n)
+        flux[0] = np.sum(n * (0.5 * (e[:k] + h[:k] / n)) ** 2)
+        return flux
+
+    def port_transmission(self):
+        """ Time-integrated flux through each output port relative to the
+        forward flux through the input line (%) """
+        if not self.flux_history: return {}
+        energy = np.sum(self.flux_history, axis=0)
+        ref = energy[0] if energy[0] > 0 else 1.0
+        return {m['label']: float(100 * e / ref) for m, e in zip(self.monitors[1:], energy[1:])}
+
+    def build_source(self, n_steps=None):
+        """ Precomputes the injection: the waveform table (one amplitude per
+        simulated step) and the source cells with their weights, so step()
+        does a single indexed add. Line sources span the input core; the
+        mode profile is the slab mode of that core on the FDTD grid. """
+        self.waveform = WAVEFORMS[self.params.get('source', "Gaussian pulse")]
+        n = max(n_steps or 0, self.default_steps) // self.coarsen + 1
+        self._wave = self.waveform(np.arange(n) * self.coarsen)
+
+        profile = self.params.get('source_profile', "Point")
+        col = self.epsilon[self.src_x]
+        core = np.nonzero(col[self.src_y - 20:self.src_y + 20] > 1.0)[0] + self.src_y - 20
+        if profile == "Point" or not len(core):
+            rows, weights = np.array([self.src_y]), np.array([1.0])
+        elif profile == "Line":
+            rows = core
+            weights = np.full(len(rows), 1.0 / len(rows))
+        else:
+            # Grid units: the carrier's vacuum wavelength is SOURCE_PERIOD / 2 cells
+            centre = 0.5 * (core[0] + core[-1])
+            n_eff, x, fields = mode_solver.solve_slab(np.sqrt(col[self.src_y]), 1.0, len(core),
+                                                      SOURCE_PERIOD / 2, self.pol_mode)
+            rows = np.arange(max(int(centre + x[0]), 1), min(int(centre + x[-1]), self.size_y - 1))
+            weights = np.interp(rows - centre, x, fields[0])
+            weights /= weights.sum()
+
+        # Sum onto simulated rows; a mirrored row stands for itself and its image
+        local = np.bincount(self.y_map[rows], weights, minlength=len(self.y_map))
+        if self.symmetric: local /= 2
+        self._src_rows = np.nonzero(local)[0]
+        self._src_weights = local[self._src_rows]
+        self._src_col = self.x_map[self.src_x]
+
+    def source(self, t):
+        """ Source amplitude at fine-grid time t (scalar or array) """
+        return self.waveform(t)
+
+    @property
+    def history_input(self):
+        """ |source| for every step run so far, read from the waveform table """
+        return np.abs(self._wave[:self.steps_done]).tolist()
+
+    def step(self, t):
+        """ Advances the fields by one time step and records the probes """
+        cells, decay = self._loss_cells, self._loss_decay
+        if self.pol_mode == 'TM':
+            self.Comp1[:, :-1] -= 0.5 * (self.MainField[:, 1:] - self.MainField[:, :-1])
+            self.Comp2[:-1, :] += 0.5 * (self.MainField[1:, :] - self.MainField[:-1, :])
+            self.MainField.ravel()[cells] *= decay
+            self.MainField[1:, 1:] += self.C_inv[1:, 1:] * ((self.Comp2[1:, 1:] - self.Comp2[:-1, 1:]) - (self.Comp1[1:, 1:] - self.Comp1[1:, :-1]))
+        else: # TE
+            self.Comp1.ravel()[cells] *= decay
+            self.Comp2.ravel()[cells] *= decay
+            self.Comp1[:, 1:] += self.C_inv[:, 1:] * (self.MainField[:, 1:] - self.MainField[:, :-1])
+            self.Comp2[1:, :] -= self.C_inv[1:, :] * (self.MainField[1:, :] - self.MainField[:-1, :])
+            self.MainField[:-1, :-1] += 0.5 * ((self.Comp1[:-1, 1:] - self.Comp1[:-1, :-1]) - (self.Comp2[1:, :-1] - self.Comp2[:-1, :-1]))
+
+        if t >= len(self._wave): self.build_source(2 * t * self.coarsen)
+        self.MainField[self._src_col, self._src_rows] += self._wave[t] * self._src_weights
+        if self.symmetric: self.MainField[:, 0] = self.MainField[:, 1]
+        self.steps_done = t + 1
+
+        x_map, y_map = self.x_map, self.y_map
+        self.history_out_default.append(abs(self.MainField[x_map[self.def_out_x], y_map[self.def_out_y]]))
+        self.flux_history.append(self.sample_flux())
+
+        for d in self.detectors:
+            if d['active']:
+                d['data'].append(abs(self.MainField[x_map[d['x']], y_map[d['y']]]))
+
+    def run(self, n_steps=None, progress=None):
+        """ Runs a full simulation from t=0; progress(done, total) is optional.
+        n_steps counts full-grid steps (a coarsened grid takes fewer). """
+        n_steps = self.default_steps if n_steps is None else n_steps
+        n_steps //= self.coarsen
+        self.reset()
+        for t in range(n_steps):
+            self.step(t)
+            if progress and t % 50 == 0: progress(t, n_steps)
+        return self
+
+    def core_wavelength_cells(self):
+        """ Carrier wavelength inside the highest-index cell, in fine-grid cells """
+        return SOURCE_PERIOD * 0.5 / np.sqrt(self.epsilon.max())
+
+    def resolved(self):
+        return self.core_wavelength_cells() >= MIN_CELLS_PER_WAVELENGTH
+
+    def preview_resolved(self, factor=PREVIEW_FACTOR):
+        return self.core_wavelength_cells() / factor >= PREVIEW_MIN_CELLS
+
+    def preview(self, n_steps=None, factor=PREVIEW_FACTOR, progress=None):
+        """ Runs the same design on a coarsened grid and returns that engine """
+        detectors = [dict(d, data=[]) for d in self.detectors]
+        return FDTDEngine(self.params, detectors, coarsen=factor).run(n_steps, progress)
+
+    def collect_run_data(self):
+        """ All traces of the last run plus metadata, ready for data_export """
+        traces = {"input": self.history_input, "output_main": self.history_out_default}
+        for d in self.detectors:
+            traces[d['label']] = d['data']
+
+        max_in = max(self.history_input, default=0) or 1
+        eff = {k: 100 * max(v, default=0) / max_in for k, v in traces.items() if k != "input"}
+        if self.flux_history:
+            flux = np.array(self.flux_history)
+            for j, m in enumerate(self.monitors):
+                traces[f"flux_{m['label']}"] = flux[:, j]
+        meta = data_export.build_metadata(
+            self.params, steps=len(self.history_input), grid=[self.size_x, self.size_y],
+            source=[self.src_x, self.src_y], output=[self.def_out_x, self.def_out_y],
+            detectors={d['label']: [d['x'], d['y']] for d in self.detectors}, efficiency=eff, coarsen=self.coarsen,
+            monitors={m['label']: [m['x'], m['y0'], m['y1']] for m in self.monitors},
+            port_transmission=self.port_transmission())
+        return traces, meta
+
+    def cache_params(self, n_steps):
+        """ Everything that determines the traces of an n_steps run """
+        return {"kind": "fdtd", "engine": ENGINE_VERSION, "modes": mode_solver.TABLE_VERSION,
+                "steps": n_steps, "symmetric": self.symmetric, "coarsen": self.coarsen,
+                "params": {k: v for k, v in self.params.items() if k != 'view_mode'},
+                "grid": [self.size_x, self.size_y],
+                "detectors": [[d['label'], d['x'], d['y'], d['active']] for d in self.detectors]}
+
+    def result_arrays(self):
+        """ Traces plus the final field snapshot, for the result store """
+        traces, meta = self.collect_run_data()
+        traces = dict(traces, field=self.full_field())
+        return traces, meta
+
+    def restore(self, arrays):
+        """ Loads a stored run back into the engine (inverse of result_arrays) """
+        self.reset()
+        self.steps_done = len(arrays["input"])
+        self.build_source(self.steps_done * self.coarsen)
+        self.history_out_default = list(arrays["output_main"])
+        for d in self.detectors:
+            if d['label'] in arrays: d['data'] = list(arrays[d['label']])
+        flux = [arrays[f"flux_{m['label']}"] for m in self.monitors if f"flux_{m['label']}" in arrays]
+        if len(flux) == len(self.monitors):
+            self.flux_history = list(np.column_stack(flux))
+        rows = np.zeros(self.MainField.shape[1], dtype=int)
+        rows[self.y_map] = np.arange(self.size_y)
+        if self.symmetric: rows[0] = rows[1]
+        cols = np.arange(self.MainField.shape[0]) * self.coarsen
+        self.MainField[:] = arrays["field"][np.ix_(cols, rows)]
+
+def coarse_fine_difference(coarse, fine):
+    """ |T_fine - T_coarse| per port (percentage points). Both grids are far
+    from the asymptotic range, so this is a spread, not an error bound. """
+    return {k: abs(v - coarse.get(k, v)) for k, v in fine.items()}
\ No newline at end of file
@@ -3,13 +3,14 @@ import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.animation import FuncAnimation
-from mpl_toolkits.mplot3d import Axes3D 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import datetime
+import fdtd_engine
+import data_export
+import result_store
 
 class FDTDWindow(tk.Toplevel):
-    def __init__(self, parent, params):
+    def __init__(self, parent, params, engine=None, jobs=None):
         super().__init__(parent)
         self.title(f"FDTD Simulation Lab - {params.get('type', 'Custom')}")
         
@@ -21,14 +22,18 @@ class FDTDWindow(tk.Toplevel):
         
         # --- INTERNAL STATE ---
         self.params = params
-        self.detectors = [] 
         self.detector_counter = 1
         self.is_placing_detector = False
         self.simulation_running = False
         self.ani = None
+        self.jobs = jobs            # job_scheduler.JobScheduler for background refinement
+        self.refine_job = None
         
-        # Physical Parameters
+        # Physical Parameters (the engine owns the detector list)
         self.parse_params()
+        self.engine = engine or fdtd_engine.FDTDEngine(params)
+        self.detectors = self.engine.detectors
+        self.store = result_store.get_store()
         
         # --- LAYOUT ---
         # 1. Plot Area (Top)
@@ -49,33 +54,22 @@ class FDTDWindow(tk.Toplevel):
         self.create_controls()
         
         # 3. Initialize Simulation
-        self.reset_simulation_data()
         self.draw_geometry_preview()
 
+    def is_3d_axes(self):
+        # Avoids importing mpl_toolkits.mplot3d until a 3D view is requested
+        return getattr(self.ax, 'name', '') == '3d'
+
     def on_close(self):
         """ Cleans up Matplotlib memory on window close """
         if self.ani and self.ani.event_source:
             self.ani.event_source.stop()
+        if self.refine_job: self.refine_job.cancel()
         plt.close(self.fig) # Fixes RuntimeWarning
         self.destroy()
 
     def parse_params(self):
-        p = self.params
-        self.guide_type = p['type']
-        self.pol_mode = p.get('polarization', 'TM')
-        self.view_mode = p.get('view_mode', '2D')
-        self.real_width = float(p.get('width_um', 2.0))
-        self.real_angle = float(p.get('angle_deg', 2.0))
-        self.real_offset = float(p.get('offset_um', 5.0))
-        self.n_ports = int(p.get('ports', 2))
-        
-        self.size_x = 300
-        self.size_y = 200
-        self.default_steps = int(self.size_x * 5)
-        
-        self.mid_y = self.size_y // 2
-        self.src_x, self.src_y = 30, self.mid_y
-        self.def_out_x, self.def_out_y = self.size_x - 30, self.mid_y 
+        self.view_mode = self.params.get('view_mode', '2D')
 
     def create_controls(self):
         # --- Section 1: Simulation Control (Always Visible) ---
@@ -84,11 +78,27 @@ class FDTDWindow(tk.Toplevel):
         
         tk.Label(frm_sim, text="Steps:").pack(side=tk.LEFT)
         self.ent_steps = tk.Entry(frm_sim, width=8)
-        self.ent_steps.insert(0, str(self.default_steps))
+        self.ent_steps.insert(0, str(self.engine.default_steps))
         self.ent_steps.pack(side=tk.LEFT, padx=5)
+
+        tk.Label(frm_sim, text="Source:").pack(side=tk.LEFT)
+        self.combo_wave = ttk.Combobox(frm_sim, state="readonly", width=13, values=list(fdtd_engine.WAVEFORMS))
+        self.combo_wave.set(self.params.get('source', "Gaussian pulse"))
+        self.combo_wave.pack(side=tk.LEFT, padx=2)
+        self.combo_profile = ttk.Combobox(frm_sim, state="readonly", width=11, values=fdtd_engine.SOURCE_PROFILES)
+        self.combo_profile.set(self.params.get('source_profile', "Point"))
+        self.combo_profile.pack(side=tk.LEFT, padx=(2, 5))
         
         tk.Button(frm_sim, text="▶ START / RESTART", bg="#4CAF50", fg="white", command=self.start_simulation).pack(side=tk.LEFT, padx=5)
 
+        # Coarse preview first, full resolution refined in the background;
+        # only offered when the coarse grid still resolves the core wavelength
+        resolved = self.engine.preview_resolved()
+        self.progressive = tk.BooleanVar(value=self.jobs is not None and resolved)
+        if self.jobs is not None:
+            tk.Checkbutton(frm_sim, text="Progressive", variable=self.progressive,
+                           state=tk.NORMAL if resolved else tk.DISABLED).pack(side=tk.LEFT, padx=5)
+
         # Analysis options only for 2D
         if self.view_mode == '2D':
             # --- Section 2: Detector Management ---
@@ -118,6 +128,8 @@ class FDTDWindow(tk.Toplevel):
             self.btn_show_res.pack(side=tk.LEFT, padx=5)
             
             self.combo_dets.bind("<<ComboboxSelected>>", self.update_result_button_text)
+
+            tk.Button(frm_res, text="Export All", bg="#FF9800", fg="white", command=self.export_all).pack(side=tk.LEFT, padx=5)
             
             self.update_combo_detectors()
         else:
@@ -147,7 +159,7 @@ class FDTDWindow(tk.Toplevel):
         if self.is_placing_detector and event.xdata and event.ydata:
             x, y = int(event.xdata), int(event.ydata)
             
-            if 0 <= x < self.size_x and 0 <= y < self.size_y:
+            if 0 <= x < self.engine.size_x and 0 <= y < self.engine.size_y:
                 label = f"D{self.detector_counter}"
                 self.detectors.append({
                     'id': self.detector_counter,
@@ -164,7 +176,7 @@ class FDTDWindow(tk.Toplevel):
                 messagebox.showwarning("Warning", "Click outside the grid!")
 
     def update_combo_detectors(self):
-        items = ["Output Port (Main)"]
+        items = ["Output Port (Main)", "Port Power (Flux)"]
         for d in self.detectors:
             items.append(f"{d['label']} (Detector)")
             
@@ -222,106 +234,38 @@ class FDTDWindow(tk.Toplevel):
     # --- FDTD SIMULATION ---
 
     def reset_simulation_data(self):
-        self.MainField = np.zeros((self.size_x, self.size_y))
-        self.Comp1 = np.zeros((self.size_x, self.size_y))
-        self.Comp2 = np.zeros((self.size_x, self.size_y))
-        
-        self.epsilon = np.ones((self.size_x, self.size_y)) * 1.0
-        self.build_geometry()
-        self.C_inv = 0.5 / self.epsilon
-        
-        self.history_input = []
-        self.history_out_default = []
-        for d in self.detectors:
-            d['data'] = []
-
-    def build_geometry(self):
-        SCALE = 10.0
-        p_width = self.real_width
-        sim_epsilon_val = 2.25
-        
-        if p_width < 1.5: sim_epsilon_val = 1.05 + (p_width / 1.5)
-        self.loss_factor = 1.0
-        if self.guide_type == "S-Bend" and self.real_offset > 20: self.loss_factor = 0.995
-        if self.guide_type == "Y-Branch" and self.real_angle > 10: self.loss_factor = 0.995
-
-        def draw_rect(y, w, start=0, end=None):
-            if end is None: end = self.size_x
-            self.epsilon[start:end, y-w:y+w] = sim_epsilon_val
-
-        w_px = 6 
-
-        if self.guide_type == "Straight Guide":
-            draw_rect(self.mid_y, w_px)
-
-        elif self.guide_type == "S-Bend":
-            bend_len = 120; offset = 30; start_x = 30
-            draw_rect(self.mid_y, w_px, 0, start_x)
-            for i in range(start_x, start_x + bend_len):
-                if i >= self.size_x: break
-                u = (i - start_x) / bend_len
-                s = 0.5 * (1 - np.cos(np.pi * u))
-                cy = int(self.mid_y + s * offset)
-                self.epsilon[i, cy-w_px:cy+w_px] = sim_epsilon_val
-            draw_rect(self.mid_y+offset, w_px, start_x+bend_len, self.size_x)
-            self.def_out_y = self.mid_y + offset
-
-        elif self.guide_type == "Y-Branch":
-            draw_rect(self.mid_y, w_px, 0, 50)
-            slope = 0.3
-            for i in range(50, self.size_x):
-                shift = int((i - 50) * slope)
-                if self.mid_y+shift+6 < self.size_y: self.epsilon[i, self.mid_y+shift-6:self.mid_y+shift+6] = sim_epsilon_val
-                if self.mid_y-shift-6 > 0:      self.epsilon[i, self.mid_y-shift-6:self.mid_y-shift+6] = sim_epsilon_val
-            self.def_out_y = self.mid_y + int((self.size_x - 70) * slope)
-
-        elif self.guide_type == "MMI (Splitter)":
-            draw_rect(self.mid_y, 5, 0, 40)
-            vis_w = 20 if self.n_ports > 2 else 12
-            draw_rect(self.mid_y, vis_w, 40, 140)
-            out_spacing = 15
-            start_y_out = self.mid_y - ((self.n_ports-1) * out_spacing)/2
-            for k in range(self.n_ports):
-                oy = int(start_y_out + k * out_spacing)
-                self.epsilon[140:, oy-5:oy+5] = sim_epsilon_val
-                if k==0: self.def_out_y = oy
-        
-        elif self.guide_type == "Grating (Bragg)":
-            draw_rect(self.mid_y, w_px)
-            for i in range(60, 160, 15):
-                self.epsilon[i:i+6, self.mid_y-9:self.mid_y+9] = sim_epsilon_val
-        else:
-            draw_rect(self.mid_y, w_px)
+        self.engine.reset()
 
     def draw_geometry_preview(self):
         self.ax.clear()
         if self.view_mode == '2D':
-            if isinstance(self.ax, Axes3D):
+            if self.is_3d_axes():
                  self.ax.remove()
                  self.ax = self.fig.add_subplot(111)
 
-            self.ax.imshow(np.zeros((self.size_y, self.size_x)), cmap='magma', vmin=0, vmax=0.15, origin='lower')
-            self.ax.contour(self.epsilon.T, levels=[1.1], colors='cyan', linewidths=1.0, alpha=0.5)
+            self.ax.imshow(np.zeros((self.engine.size_y, self.engine.size_x)), cmap='magma', vmin=0, vmax=0.15, origin='lower')
+            self.ax.contour(self.engine.epsilon.T, levels=[1.1], colors='cyan', linewidths=1.0, alpha=0.5)
             
-            self.ax.plot(self.src_x, self.src_y, 'wo'); self.ax.text(self.src_x, self.src_y - 15, "IN", color='white')
+            self.ax.plot(self.engine.src_x, self.engine.src_y, 'wo'); self.ax.text(self.engine.src_x, self.engine.src_y - 15, "IN", color='white')
             
-            self.ax.plot(self.def_out_x, self.def_out_y, 'go', markersize=8, markeredgecolor='white')
-            self.ax.text(self.def_out_x, self.def_out_y - 15, "OUT", color='lime', fontweight='bold')
+            self.ax.plot(self.engine.def_out_x, self.engine.def_out_y, 'go', markersize=8, markeredgecolor='white')
+            self.ax.text(self.engine.def_out_x, self.engine.def_out_y - 15, "OUT", color='lime', fontweight='bold')
+            self.draw_monitors()
             
             for d in self.detectors:
                 if d['active']:
                     self.ax.plot(d['x'], d['y'], 'yo', markersize=6)
                     self.ax.text(d['x'], d['y'] + 10, d['label'], color='yellow', fontsize=8)
             
-            self.ax.set_title(f"Configuration: {self.guide_type} [{self.pol_mode}]")
+            self.ax.set_title(f"Configuration: {self.engine.guide_type} [{self.engine.pol_mode}]{self.resolution_note()}")
         
         elif self.view_mode == '3D':
-            if not isinstance(self.ax, Axes3D):
+            if not self.is_3d_axes():
                 self.ax.remove()
                 self.ax = self.fig.add_subplot(111, projection='3d')
             
-            X, Y = np.meshgrid(np.arange(self.size_y), np.arange(self.size_x))
-            self.ax.plot_surface(X, Y, np.zeros((self.size_x, self.size_y)), cmap='magma')
+            X, Y = np.meshgrid(np.arange(self.engine.size_y), np.arange(self.engine.size_x))
+            self.ax.plot_surface(X, Y, np.zeros((self.engine.size_x, self.engine.size_y)), cmap='magma')
             self.ax.set_title("3D Preview")
 
         self.canvas.draw()
@@ -329,91 +273,163 @@ class FDTDWindow(tk.Toplevel):
     def start_simulation(self):
         if self.ani and self.ani.event_source:
             self.ani.event_source.stop()
-        
+        if self.refine_job: self.refine_job.cancel()
+
+        # Source choice is part of the run parameters (and of the cache key)
+        self.engine.params.update(source=self.combo_wave.get(), source_profile=self.combo_profile.get())
         self.reset_simulation_data()
         
         try:
             self.total_steps = int(self.ent_steps.get())
         except:
-            self.total_steps = self.default_steps
+            self.total_steps = self.engine.default_steps
             
         steps_per_frame = 5
         self.n_frames = self.total_steps // steps_per_frame
         
-        self.X, self.Y = np.meshgrid(np.arange(self.size_y), np.arange(self.size_x))
+        self.X, self.Y = np.meshgrid(np.arange(self.engine.size_y), np.arange(self.engine.size_x))
         
         self.ax.clear()
         if self.view_mode == '3D':
-             if not isinstance(self.ax, Axes3D): 
+             if not self.is_3d_axes(): 
                 self.ax.remove()
                 self.ax = self.fig.add_subplot(111, projection='3d')
-             self.surf = self.ax.plot_surface(self.X, self.Y, np.abs(self.MainField), cmap='magma', vmin=0, vmax=0.15)
+             self.surf = self.ax.plot_surface(self.X, self.Y, np.abs(self.engine.full_field()), cmap='magma', vmin=0, vmax=0.15)
              self.ax.set_zlim(0, 0.2)
         else:
-             if isinstance(self.ax, Axes3D):
+             if self.is_3d_axes():
                  self.ax.remove()
                  self.ax = self.fig.add_subplot(111)
-             self.im = self.ax.imshow(np.abs(self.MainField.T), cmap='magma', vmin=0, vmax=0.15, origin='lower')
-             self.ax.contour(self.epsilon.T, levels=[1.1], colors='cyan', linewidths=1.0, alpha=0.5)
+             self.im = self.ax.imshow(np.abs(self.engine.full_field().T), cmap='magma', vmin=0, vmax=0.15, origin='lower')
+             self.ax.contour(self.engine.epsilon.T, levels=[1.1], colors='cyan', linewidths=1.0, alpha=0.5)
              
-             self.ax.plot(self.src_x, self.src_y, 'wo')
-             self.ax.plot(self.def_out_x, self.def_out_y, 'go')
+             self.ax.plot(self.engine.src_x, self.engine.src_y, 'wo')
+             self.ax.plot(self.engine.def_out_x, self.engine.def_out_y, 'go')
+             self.draw_monitors()
              for d in self.detectors:
                  if d['active']:
                      self.ax.plot(d['x'], d['y'], 'yo', markersize=5)
                      self.ax.text(d['x'], d['y']+5, d['label'], color='yellow', fontsize=8)
 
-        t0 = 40; spread = 12
-        def source(t):
-            return np.exp(-0.5 * ((t - t0) / spread) ** 2) * np.sin(2 * np.pi * t / 20)
+        # A known design is a cache read instead of a re-run
+        steps_run = self.n_frames * steps_per_frame
+        cache_key = result_store.make_key(self.engine.cache_params(steps_run))
+        cached = self.store.get(cache_key) if self.store else None
+        if cached:
+            self.engine.restore(cached[0])
+            self.draw_frame(steps_run - 1, " [cached]")
+            self.canvas.draw()
+            return
+
+        if self.progressive.get():
+            self.run_progressive(steps_run, cache_key)
+            return
 
         def update(frame):
             for _ in range(steps_per_frame):
                 t = frame * steps_per_frame + _
-                
-                if self.pol_mode == 'TM':
-                    self.Comp1[:, :-1] -= 0.5 * (self.MainField[:, 1:] - self.MainField[:, :-1])
-                    self.Comp2[:-1, :] += 0.5 * (self.MainField[1:, :] - self.MainField[:-1, :])
-                    self.MainField[1:, 1:] += self.C_inv[1:, 1:] * ((self.Comp2[1:, 1:] - self.Comp2[:-1, 1:]) - (self.Comp1[1:, 1:] - self.Comp1[1:, :-1]))
-                else: # TE
-                    self.Comp1[:, 1:] += self.C_inv[:, 1:] * (self.MainField[:, 1:] - self.MainField[:, :-1])
-                    self.Comp2[1:, :] -= self.C_inv[1:, :] * (self.MainField[1:, :] - self.MainField[:-1, :])
-                    self.MainField[:-1, :-1] += 0.5 * ((self.Comp1[:-1, 1:] - self.Comp1[:-1, :-1]) - (self.Comp2[1:, :-1] - self.Comp2[:-1, :-1]))
-
-                src_val = source(t)
-                self.MainField[self.src_x, self.src_y] += src_val
-                if self.loss_factor < 1.0: self.MainField *= self.loss_factor
-
-                self.history_input.append(abs(src_val))
-                self.history_out_default.append(abs(self.MainField[self.def_out_x, self.def_out_y]))
-                
-                for d in self.detectors:
-                    if d['active']:
-                        d['data'].append(abs(self.MainField[d['x'], d['y']]))
-
-            mag_field = np.abs(self.MainField)
-            if self.view_mode == '3D':
-                self.ax.clear()
-                self.ax.set_zlim(0, 0.2)
-                self.ax.plot_surface(self.X, self.Y, mag_field, cmap='magma', vmin=0, vmax=0.15, rstride=5, cstride=5, shade=False)
-                self.ax.set_title(f"3D Simulation (Step {t})")
-            else:
-                self.im.set_array(mag_field.T)
-                self.ax.set_title(f"FDTD Simulation (Step {t}/{self.total_steps})")
-                return [self.im]
+                self.engine.step(t)
+
+            if frame == self.n_frames - 1:
+                self.save_result(cache_key)
+            return self.draw_frame(t)
 
         self.ani = FuncAnimation(self.fig, update, frames=self.n_frames, interval=1, blit=False, repeat=False)
         self.canvas.draw()
 
+    def run_progressive(self, n_steps, cache_key):
+        """ Shows a coarse-grid run at once, then runs the full grid as a
+        background job and swaps its result in. The title then shows how
+        far the preview's port transmissions were from the full run. """
+        coarse = self.engine.preview(n_steps)
+        self.draw_frame(n_steps - 1, " [preview, refining...]", field=coarse.full_field())
+        self.canvas.draw()
+        params, detectors = dict(self.engine.params), [dict(d, data=[]) for d in self.detectors]
+
+        def refine(progress):
+            return fdtd_engine.FDTDEngine(params, detectors).run(n_steps, progress).result_arrays()[0]
+
+        def swap_in(arrays):
+            if self.refine_job is not job or not self.winfo_exists(): return   # superseded by a restart
+            self.engine.restore(arrays)
+            self.save_result(cache_key)
+            diff = fdtd_engine.coarse_fine_difference(coarse.port_transmission(), self.engine.port_transmission())
+            self.draw_frame(n_steps - 1, f" [refined, preview off by {max(diff.values(), default=0.0):.1f} pts]")
+            self.canvas.draw()
+
+        job = self.refine_job = self.jobs.submit(refine, label="FDTD refine", on_done=swap_in)
+
+    def draw_frame(self, t, note="", field=None):
+        mag_field = np.abs(self.engine.full_field() if field is None else field)
+        if self.view_mode == '3D':
+            self.ax.clear()
+            self.ax.set_zlim(0, 0.2)
+            self.ax.plot_surface(self.X, self.Y, mag_field, cmap='magma', vmin=0, vmax=0.15, rstride=5, cstride=5, shade=False)
+            self.ax.set_title(f"3D Simulation (Step {t}){note}")
+        else:
+            self.im.set_array(mag_field.T)
+            self.ax.set_title(f"FDTD Simulation (Step {t}/{self.total_steps}){note}")
+            return [self.im]
+
+    def resolution_note(self):
+        if self.engine.resolved(): return ""
+        return f" - core under-resolved ({self.engine.core_wavelength_cells():.1f} cells/wl)"
+
+    def save_result(self, key):
+        if not self.store: return
+        arrays, meta = self.engine.result_arrays()
+        try:
+            self.store.put(key, arrays, meta, kind="fdtd", type=self.engine.guide_type,
+                           material=self.engine.material or "", polarization=self.engine.pol_mode)
+        except result_store.STORE_ERRORS:
+            pass  # a full or read-only cache must not break the simulation
+
+    def draw_monitors(self):
+        for m in self.engine.monitors:
+            self.ax.plot([m['x'], m['x']], [m['y0'], m['y1']], '-', color='deepskyblue', linewidth=1.5)
+            self.ax.text(m['x'] + 3, m['y1'], m['label'], color='deepskyblue', fontsize=7)
+
+    def show_flux_results(self):
+        res_win = tk.Toplevel(self)
+        res_win.title("Results: Port Power (Flux)")
+        res_win.geometry("800x500")
+
+        def on_res_close():
+            plt.close(fig_res)
+            res_win.destroy()
+        res_win.protocol("WM_DELETE_WINDOW", on_res_close)
+
+        fig_res, ax_res = plt.subplots(figsize=(8, 4))
+        energy = np.cumsum(np.array(self.engine.flux_history), axis=0)
+        ref = energy[-1, 0] if energy[-1, 0] > 0 else 1.0
+        trans = self.engine.port_transmission()
+        for j, m in enumerate(self.engine.monitors):
+            label = m['label'] if j == 0 else f"{m['label']} ({trans[m['label']]:.1f}%)"
+            ax_res.plot(energy[:, j] / ref, label=label, linewidth=2 if j else 1, linestyle='--' if j == 0 else '-')
+
+        total = sum(trans.values())
+        ax_res.set_title(f"Integrated Poynting Flux per Port (Total: {total:.2f}% of input){self.resolution_note()}")
+        ax_res.set_ylabel("Energy / Input Energy")
+        ax_res.legend()
+        ax_res.grid(True, alpha=0.3)
+
+        canvas_res = FigureCanvasTkAgg(fig_res, master=res_win)
+        canvas_res.draw()
+        canvas_res.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
     def show_results(self, selection_str):
-        if not self.history_input:
+        if not self.engine.history_input:
             messagebox.showinfo("Info", "Run simulation first!")
             return
 
+        if "Flux" in selection_str:
+            self.show_flux_results()
+            return
+
         target_label = selection_str.split('(')[0].strip()
         
         if "Output Port" in selection_str:
-            data = self.history_out_default
+            data = self.engine.history_out_default
             display_name = "Output Port (Main)"
         else:
             det = next((d for d in self.detectors if d['label'] == target_label), None)
@@ -438,11 +454,11 @@ class FDTDWindow(tk.Toplevel):
 
         fig_res, ax_res = plt.subplots(figsize=(8, 4))
         
-        ax_res.plot(self.history_input, 'r-', label='Input Pulse', alpha=0.5)
+        ax_res.plot(self.engine.history_input, 'r-', label='Input Pulse', alpha=0.5)
         ax_res.plot(data, 'g-', label=f'{display_name} Signal', linewidth=2)
         ax_res.fill_between(range(len(data)), data, color='green', alpha=0.1)
         
-        max_in = np.max(self.history_input) if np.max(self.history_input) > 0 else 1
+        max_in = np.max(self.engine.history_input) if np.max(self.engine.history_input) > 0 else 1
         max_out = np.max(data)
         eff = (max_out/max_in)*100
         
@@ -459,21 +475,30 @@ class FDTDWindow(tk.Toplevel):
         btn_exp.pack(pady=10)
 
     def export_data(self, label, data, eff):
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         filename = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv")])
         
         if filename:
             try:
-                with open(filename, 'w') as f:
-                    f.write(f"# Export Data - {label}\n")
-                    f.write(f"# Date: {timestamp}\n")
-                    f.write(f"# Efficiency: {eff:.4f}%\n")
-                    f.write("TimeStep,Input,Output\n")
-                    for t, (i, o) in enumerate(zip(self.history_input, data)):
-                        f.write(f"{t},{i:.6f},{o:.6f}\n")
+                meta = data_export.build_metadata(self.params, label=label, efficiency=f"{eff:.4f}%")
+                data_export.export_csv(filename, {"Input": self.engine.history_input, "Output": data}, meta)
+                messagebox.showinfo("Success", "Data saved!")
+            except Exception as e:
+                messagebox.showerror("Error", str(e))
+
+    def export_all(self, filename=None):
+        """ Writes every trace in one file; pass filename to skip the dialog """
+        if not self.engine.history_input:
+            messagebox.showinfo("Info", "Run simulation first!")
+            return
+        if filename is None:
+            filename = filedialog.asksaveasfilename(defaultextension=".npz",
+                                                    filetypes=[("NumPy archive", "*.npz"), ("CSV", "*.csv")])
+        if filename:
+            try:
+                data_export.export_run(filename, *self.engine.collect_run_data())
                 messagebox.showinfo("Success", "Data saved!")
             except Exception as e:
                 messagebox.showerror("Error", str(e))
 
-def run_fdtd_demo(params):
-    win = FDTDWindow(None, params)
\ No newline at end of file
+def run_fdtd_demo(params, engine=None, jobs=None):
+    win = FDTDWindow(None, params, engine, jobs)
\ No newline at end of file
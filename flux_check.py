@@ -0,0 +1,31 @@
+# flux_check.py
+# Checks the FDTD port power against a case with a known answer: a lossless
+# straight guide fed by its own mode must deliver (almost) all of the
+# forward input flux to the output port, in both polarizations and on both
+# the full and the half (symmetry plane) grid.
+# Usage: python flux_check.py
+import sys
+import fdtd_engine
+
+# Accepted port transmission (%) of the lossless guide. The mode source is
+# the slab mode of the continuous problem, so a few % radiate at launch.
+MIN_PERCENT = 95.0
+MAX_PERCENT = 100.5
+
+CASE = {"type": "Straight Guide", "source_profile": "Mode profile"}   # no material: lossless core
+
+def report():
+    ok = True
+    for pol in ("TM", "TE"):
+        for symmetry in (True, False):
+            engine = fdtd_engine.FDTDEngine(dict(CASE, polarization=pol, symmetry=symmetry)).run()
+            t = engine.port_transmission()["Out"]
+            passed = MIN_PERCENT <= t <= MAX_PERCENT
+            ok &= passed
+            grid = "half grid" if engine.symmetric else "full grid"
+            print(f"{pol} {grid:9}: {t:6.2f} % (expected {MIN_PERCENT:.0f}-{MAX_PERCENT:.1f} %) "
+                  f"{'OK' if passed else 'FAIL'}")
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if report() else 1)
\ No newline at end of file
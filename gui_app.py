@@ -1,15 +1,22 @@
 # gui_app.py
 import tkinter as tk
 from tkinter import ttk, messagebox
+import json
 import optimizer
 import materials
-import fdtd_sim
+import job_scheduler
+import result_store
 
 class OpticalDesignApp:
     def __init__(self, root):
         self.root = root
         self.root.title("PyWaveGuide - Integrated Optical Design Suite")
         self.root.geometry("1000x700") 
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # Calculations run in the background; callbacks come back on the Tk thread
+        self.jobs = job_scheduler.JobScheduler(root)
+        self.jobs.on_change = self.update_job_status
         
         # --- LAYOUT ---
         left_panel = tk.Frame(root, width=380, bg="#f5f5f5", padx=10, pady=10)
@@ -60,9 +67,22 @@ class OpticalDesignApp:
         tk.Button(btn_frame, text="GENERATE DATASHEET (COMPARE)", command=self.open_datasheet, 
                   bg="#4CAF50", fg="white", font=("Segoe UI", 10, "bold"), height=2).pack(fill=tk.X, pady=(0, 10))
 
+        tk.Button(btn_frame, text="PARETO OPTIMIZE (ALL MATERIALS)", command=self.open_pareto,
+                  bg="#FF9800", fg="white", font=("Segoe UI", 10, "bold"), height=2).pack(fill=tk.X, pady=(0, 10))
+
         tk.Button(btn_frame, text="▶ RUN FDTD SIMULATION", command=self.ask_simulation_mode, 
                   bg="#D32F2F", fg="white", font=("Segoe UI", 10, "bold"), height=2).pack(fill=tk.X)
 
+        # 6. Background jobs
+        job_frame = tk.Frame(left_panel, bg="#f5f5f5")
+        job_frame.pack(fill=tk.X, side=tk.BOTTOM)
+        self.job_label = tk.Label(job_frame, text="Ready", bg="#f5f5f5", anchor="w")
+        self.job_label.pack(fill=tk.X)
+        self.job_bar = ttk.Progressbar(job_frame, mode="determinate", maximum=1.0)
+        self.job_bar.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.btn_cancel = tk.Button(job_frame, text="Cancel", state=tk.DISABLED, command=self.jobs.cancel)
+        self.btn_cancel.pack(side=tk.RIGHT, padx=(5, 0))
+
         # === VISUALIZATION (RIGHT) ===
         tk.Label(right_panel, text="Schematic Preview", bg="white", font=("Segoe UI", 10, "bold")).pack(anchor="w")
         self.canvas = tk.Canvas(right_panel, width=500, height=250, bg="#FAFAFA", bd=1, relief="solid")
@@ -152,36 +172,81 @@ class OpticalDesignApp:
                 self.canvas.create_rectangle(x, cy-15, x+10, cy+15, fill="#1565C0", outline="")
             self.canvas.create_text(cx, cy+40, text="Period", fill="blue")
 
+    def on_close(self):
+        self.jobs.shutdown()
+        self.root.destroy()
+
+    def update_job_status(self):
+        active = self.jobs.active_jobs()
+        if not active:
+            self.job_label.config(text="Ready")
+            self.job_bar['value'] = 0
+            self.btn_cancel.config(state=tk.DISABLED)
+            return
+        names = ", ".join(j.label for j in active)
+        self.job_label.config(text=f"Running ({len(active)}): {names}")
+        self.job_bar['value'] = min(j.progress for j in active)
+        self.btn_cancel.config(state=tk.NORMAL)
+
+    def submit_job(self, label, fn, *args, params=None, on_done=None, **kwargs):
+        key = (label, json.dumps(params, sort_keys=True)) if params is not None else None
+        return self.jobs.submit(fn, *args, key=key, label=label, on_done=on_done,
+                                on_error=lambda e: messagebox.showerror("Err", str(e)), **kwargs)
+
     def run_calc(self):
-        try:
-            res = optimizer.run_simulation(self.get_params())
-            self.result_text.delete(1.0, tk.END)
-            txt = f"SIMULATION RESULTS ({self.comp_type_var.get()})\n"
-            txt += "=" * 40 + "\n"
-            for k, v in res.items(): txt += f"{k:30} : {v}\n"
-            self.result_text.insert(tk.END, txt)
-        except Exception as e: messagebox.showerror("Err", str(e))
+        params = self.get_params()
+        self.submit_job("Design", lambda progress: optimizer.run_simulation(params), params=params,
+                        on_done=lambda res: self.show_calc(params, res))
+
+    def show_calc(self, params, res):
+        self.result_text.delete(1.0, tk.END)
+        txt = f"SIMULATION RESULTS ({params['type']})\n"
+        txt += "=" * 40 + "\n"
+        for k, v in res.items(): txt += f"{k:30} : {v}\n"
+        self.result_text.insert(tk.END, txt)
 
     def open_datasheet(self):
-        try:
-            params = self.get_params()
-            mat_names, spectral_data = optimizer.generate_comparative_datasheet(params)
-            ds_win = tk.Toplevel(self.root)
-            ds_win.title(f"Comparative Study: {params['type']}")
-            ds_win.geometry("1100x600")
-            tk.Label(ds_win, text="TRANSMITTANCE (%) IN VISIBLE (380-780nm)", font=("Arial", 12, "bold"), pady=10).pack()
-            columns = ["Wavelength (um)"] + mat_names
-            tree = ttk.Treeview(ds_win, columns=columns, show='headings')
-            scr = ttk.Scrollbar(ds_win, orient=tk.VERTICAL, command=tree.yview)
-            tree.configure(yscroll=scr.set); scr.pack(side=tk.RIGHT, fill=tk.Y)
-            tree.heading("Wavelength (um)", text="Wavelength (um)"); tree.column("Wavelength (um)", width=120, anchor="center")
-            for m in mat_names: tree.heading(m, text=m); tree.column(m, width=100, anchor="center")
-            for row in spectral_data:
-                vals = [row["Wavelength (um)"]]
-                for m in mat_names: vals.append(row[m])
-                tree.insert("", tk.END, values=vals)
-            tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        except Exception as e: messagebox.showerror("Err", str(e))
+        params = self.get_params()
+        self.submit_job("Datasheet", optimizer.generate_comparative_datasheet, params, params=params,
+                        store=result_store.get_store(), on_done=lambda res: self.show_datasheet(params, *res))
+
+    def show_datasheet(self, params, mat_names, spectral_data):
+        ds_win = tk.Toplevel(self.root)
+        ds_win.title(f"Comparative Study: {params['type']}")
+        ds_win.geometry("1100x600")
+        tk.Label(ds_win, text="TRANSMITTANCE (%) IN VISIBLE (380-780nm)", font=("Arial", 12, "bold"), pady=10).pack()
+        columns = ["Wavelength (um)"] + mat_names
+        tree = ttk.Treeview(ds_win, columns=columns, show='headings')
+        scr = ttk.Scrollbar(ds_win, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscroll=scr.set); scr.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.heading("Wavelength (um)", text="Wavelength (um)"); tree.column("Wavelength (um)", width=120, anchor="center")
+        for m in mat_names: tree.heading(m, text=m); tree.column(m, width=100, anchor="center")
+        for row in spectral_data:
+            vals = [row["Wavelength (um)"]]
+            for m in mat_names: vals.append(row[m])
+            tree.insert("", tk.END, values=vals)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+    def open_pareto(self):
+        params = self.get_params()
+        if params['type'] not in optimizer.SEARCH_SPACE:
+            messagebox.showinfo("Optimizer", f"No search space defined for {params['type']}")
+            return
+        self.submit_job("Pareto search", optimizer.optimize_pareto, params, params=params,
+                        on_done=lambda rows: self.show_pareto(params, rows))
+
+    def show_pareto(self, params, rows):
+        win = tk.Toplevel(self.root)
+        win.title(f"Pareto Front: {params['type']}")
+        win.geometry("1000x500")
+        tk.Label(win, text="TRANSMITTANCE vs FOOTPRINT vs COST (non-dominated designs)", font=("Arial", 12, "bold"), pady=10).pack()
+        columns = list(rows[0]) if rows else []
+        tree = ttk.Treeview(win, columns=columns, show='headings')
+        scr = ttk.Scrollbar(win, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscroll=scr.set); scr.pack(side=tk.RIGHT, fill=tk.Y)
+        for c in columns: tree.heading(c, text=c); tree.column(c, width=120, anchor="center")
+        for row in rows: tree.insert("", tk.END, values=[row[c] for c in columns])
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
     def ask_simulation_mode(self):
         popup = tk.Toplevel(self.root)
@@ -207,11 +272,21 @@ class OpticalDesignApp:
     def launch_fdtd(self, view_mode):
         params = self.get_params()
         params['view_mode'] = view_mode
-        try:
-            # We removed the messagebox that was blocking execution
-            fdtd_sim.run_fdtd_demo(params)
-        except Exception as e:
-            messagebox.showerror("FDTD Error", f"Simulation failed:\n{e}")
+
+        def prepare(progress):
+            # Loaded on first use: pulls in Matplotlib and the TkAgg backend
+            import fdtd_sim
+            import fdtd_engine
+            return fdtd_sim, fdtd_engine.FDTDEngine(params)
+
+        def open_window(res):
+            fdtd_sim, engine = res
+            try:
+                fdtd_sim.run_fdtd_demo(params, engine, self.jobs)
+            except Exception as e:
+                messagebox.showerror("FDTD Error", f"Simulation failed:\n{e}")
+
+        self.submit_job("FDTD setup", prepare, params=params, on_done=open_window)
             
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,47 @@
+# import_budget.py
+# Measures cold import time of the GUI launch and of the headless core.
+# Each target is imported in a fresh interpreter so nothing is cached.
+# Usage: python import_budget.py
+import subprocess
+import sys
+
+# Budgets in seconds (cold start, median of REPEATS runs)
+CORE_BUDGET_S = 0.25
+GUI_BUDGET_S = 0.4
+REPEATS = 5
+
+CORE_MODULES = ["materials", "mode_solver", "waveguide_models", "optimizer", "data_export", "fdtd_engine", "circuit"]
+GUI_MODULES = ["gui_app"]
+HEAVY_MODULES = ["tkinter", "matplotlib"]
+
+_PROBE = """
+import sys, time
+t = time.perf_counter()
+for name in {modules!r}: __import__(name)
+dt = time.perf_counter() - t
+print(dt, ",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+def measure(modules):
+    times, loaded = [], ""
+    for _ in range(REPEATS):
+        out = subprocess.run([sys.executable, "-c", _PROBE.format(modules=modules, heavy=HEAVY_MODULES)],
+                             capture_output=True, text=True, check=True).stdout.split()
+        times.append(float(out[0]))
+        loaded = out[1] if len(out) > 1 else ""
+    times.sort()
+    return times[len(times) // 2], loaded
+
+def report():
+    ok = True
+    for label, modules, budget in (("Headless core", CORE_MODULES, CORE_BUDGET_S),
+                                   ("GUI launch", GUI_MODULES, GUI_BUDGET_S)):
+        dt, loaded = measure(modules)
+        status = "OK" if dt <= budget else "OVER BUDGET"
+        ok &= dt <= budget
+        print(f"{label:15}: {dt*1000:7.1f} ms (budget {budget*1000:.0f} ms) {status}"
+              f"  heavy modules loaded: {loaded or 'none'}")
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if report() else 1)
@@ -0,0 +1,140 @@
+# job_scheduler.py
+import itertools
+import queue
+import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# Background jobs for the GUI
+# Work runs on a thread pool; every callback (progress, done, error) is
+# queued and dispatched on the Tk thread by poll(), so handlers may touch
+# widgets. Job functions receive a `progress(done, total)` keyword which
+# also raises JobCancelled once the job has been cancelled. A handler that
+# raises is reported and skipped; it never stops the poll loop.
+
+MAX_WORKERS = 4
+POLL_MS = 50
+
+class JobCancelled(Exception):
+    pass
+
+class Job:
+    def __init__(self, job_id, key, label):
+        self.id = job_id
+        self.key = key
+        self.label = label
+        self.state = "queued"     # queued -> running -> done / failed / cancelled
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self._cancel = threading.Event()
+        self._subscribers = []
+
+    def subscribe(self, on_done=None, on_error=None, on_progress=None):
+        self._subscribers.append((on_done, on_error, on_progress))
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def report(self, done, total=None):
+        """ Progress hook passed to the job function (worker thread) """
+        if self.cancelled: raise JobCancelled()
+        self.progress = done / total if total else float(done)
+
+class JobScheduler:
+    def __init__(self, root=None, max_workers=MAX_WORKERS, poll_ms=POLL_MS):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._events = queue.Queue()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._root = root
+        self._poll_ms = poll_ms
+        self.on_change = None     # called on the Tk thread whenever the job list changes
+        if root is not None:
+            root.after(poll_ms, self._tick)
+
+    def submit(self, fn, *args, key=None, label="", on_done=None, on_error=None, on_progress=None, **kwargs):
+        """ Queues fn(*args, progress=..., **kwargs). If a job with the same
+        key is still in flight, that job is returned and nothing new is
+        started (its own callbacks will deliver the result). """
+        with self._lock:
+            job = self._inflight.get(key) if key is not None else None
+            if job is not None and not job.cancelled:
+                return job
+            job = Job(next(self._ids), key, label)
+            job.subscribe(on_done, on_error, on_progress)
+            self._inflight[key if key is not None else ("job", job.id)] = job
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        self._events.put((job, "changed", None))
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        try:
+            if job.cancelled: raise JobCancelled()
+            job.state = "running"
+            self._events.put((job, "changed", None))
+
+            def progress(done, total=None):
+                job.report(done, total)
+                self._events.put((job, "progress", job.progress))
+
+            job.result = fn(*args, progress=progress, **kwargs)
+            job.state = "done"
+        except JobCancelled:
+            job.state = "cancelled"
+        except Exception as e:
+            job.error = e
+            job.state = "failed"
+        finally:
+            with self._lock:
+                for k, j in list(self._inflight.items()):
+                    if j is job: del self._inflight[k]
+            self._events.put((job, job.state, job.result if job.state == "done" else job.error))
+
+    def active_jobs(self):
+        with self._lock:
+            return list(self._inflight.values())
+
+    def cancel(self, job=None):
+        """ Cancels one job, or every active job when job is None """
+        for j in ([job] if job else self.active_jobs()):
+            j.cancel()
+
+    def poll(self):
+        """ Dispatches queued callbacks; must run on the Tk thread """
+        changed = False
+        while True:
+            try:
+                job, kind, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            for on_done, on_error, on_progress in list(job._subscribers):
+                if kind == "progress" and on_progress: self._dispatch(on_progress, job, payload)
+                elif kind == "done" and on_done: self._dispatch(on_done, payload)
+                elif kind == "failed" and on_error: self._dispatch(on_error, payload)
+            changed = True
+        if changed and self.on_change: self._dispatch(self.on_change)
+
+    def _dispatch(self, handler, *args):
+        try:
+            handler(*args)
+        except Exception:
+            # Same report as a failing Tk callback; the other handlers still run
+            if self._root is not None: self._root.report_callback_exception(*sys.exc_info())
+            else: traceback.print_exc()
+
+    def _tick(self):
+        try:
+            self.poll()
+        finally:
+            self._root.after(self._poll_ms, self._tick)
+
+    def shutdown(self):
+        self.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -1,4 +1,5 @@
 # materials.py
+import numpy as np
 
 # Optical materials database
 # Properties:
@@ -8,6 +9,9 @@
 # cost_base: Fixed startup cost ($)
 # cost_factor: Variable cost per unit ($)
 # min_wl / max_wl: Transparency range (um)
+# dispersion: Sellmeier or Cauchy coefficients (wavelength in um)
+#   sellmeier: n^2 = A + sum(B_i * wl^2 / (wl^2 - C_i)), C_i in um^2
+#   cauchy:    n = A + B / wl^2 + C / wl^4
 
 MATERIALS_DB = {
     "SiO2 (Silica/PLC)": {
@@ -17,6 +21,9 @@ MATERIALS_DB = {
         "cost_base": 10.0,
         "cost_factor": 1.5,
         "min_wl": 0.2, "max_wl": 2.5,
+        "dispersion": {"model": "sellmeier", "A": 1.0,  # Malitson (1965)
+                       "B": (0.6961663, 0.4079426, 0.8974794),
+                       "C": (0.0684043**2, 0.1162414**2, 9.896161**2)},
         "description": "Low loss, cheap, but requires large footprint."
     },
     "Si (Silicon-on-Insulator)": {
@@ -26,6 +33,9 @@ MATERIALS_DB = {
         "cost_base": 50.0,
         "cost_factor": 5.0,
         "min_wl": 1.1, "max_wl": 4.0, # Opaque in visible light (< 1.1 um)
+        "dispersion": {"model": "sellmeier", "A": 1.0,  # Salzberg & Villa (1957)
+                       "B": (10.6684293, 0.0030434748, 1.54133408),
+                       "C": (0.301516485**2, 1.13475115**2, 1104.0**2)},
         "description": "Extreme miniaturization, moderate cost."
     },
     "Si3N4 (Silicon Nitride)": {
@@ -35,6 +45,9 @@ MATERIALS_DB = {
         "cost_base": 40.0,
         "cost_factor": 4.0,
         "min_wl": 0.4, "max_wl": 2.0,
+        "dispersion": {"model": "sellmeier", "A": 1.0,  # Luke et al. (2015)
+                       "B": (3.0249, 40314.0),
+                       "C": (0.1353406**2, 1239.842**2)},
         "description": "Good for high power and broad spectrum."
     },
     "InP (Indium Phosphide)": {
@@ -44,6 +57,9 @@ MATERIALS_DB = {
         "cost_base": 100.0,
         "cost_factor": 20.0,
         "min_wl": 0.92, "max_wl": 3.0,
+        "dispersion": {"model": "sellmeier", "A": 7.255,  # Pettit & Turner (1965)
+                       "B": (2.316, 2.765),
+                       "C": (0.6263**2, 32.935**2)},
         "description": "Expensive, essential for active components (lasers)."
     },
     "LiNbO3 (Lithium Niobate)": {
@@ -53,6 +69,9 @@ MATERIALS_DB = {
         "cost_base": 80.0,
         "cost_factor": 15.0,
         "min_wl": 0.35, "max_wl": 4.0,
+        "dispersion": {"model": "sellmeier", "A": 1.0,  # Zelmon (1997), ordinary ray
+                       "B": (2.6734, 1.2290, 12.614),
+                       "C": (0.01764, 0.05914, 474.6)},
         "description": "Excellent for modulators."
     },
     "Polymer (PMMA/Su8)": {
@@ -62,12 +81,60 @@ MATERIALS_DB = {
         "cost_base": 5.0,
         "cost_factor": 1.0,
         "min_wl": 0.3, "max_wl": 1.6,
+        "dispersion": {"model": "cauchy", "A": 1.4760, "B": 0.0043, "C": 0.0},
         "description": "Cheapest, rapid prototyping."
     }
 }
 
+REFERENCE_WL = 1.55   # um, wavelength at which "n" is specified
+TABLE_POINTS = 512    # samples per dispersion table
+
+def evaluate_dispersion(model, wl_um):
+    """ Evaluates a Sellmeier/Cauchy model over a wavelength array (um) """
+    wl = np.asarray(wl_um, dtype=float)
+    if model["model"] == "sellmeier":
+        wl2 = wl ** 2
+        n2 = np.full_like(wl2, model.get("A", 1.0))
+        for B, C in zip(model["B"], model["C"]):
+            n2 += B * wl2 / (wl2 - C)
+        return np.sqrt(n2)
+    elif model["model"] == "cauchy":
+        return model["A"] + model.get("B", 0.0) / wl**2 + model.get("C", 0.0) / wl**4
+    raise ValueError(f"Unknown dispersion model: {model['model']}")
+
+def _build_index_table(props):
+    # Dense n(wl) table over the transparency range. The curve is anchored
+    # to the database "n" at 1550 nm so existing designs keep their values.
+    wl = np.linspace(props["min_wl"], props["max_wl"], TABLE_POINTS)
+    model = props.get("dispersion")
+    if model is None:
+        return wl, np.full_like(wl, props["n"])
+    anchor = props["n"] / float(evaluate_dispersion(model, REFERENCE_WL))
+    return wl, evaluate_dispersion(model, wl) * anchor
+
+for _props in MATERIALS_DB.values():
+    _props["n_table"] = _build_index_table(_props)
+
+def refractive_index(props, wl_um):
+    """ n(wl) from the precomputed table (clamped outside the table range) """
+    table = props.get("n_table")
+    if table is None:
+        return props["n"] if np.ndim(wl_um) == 0 else np.full(np.shape(wl_um), props["n"])
+    n = np.interp(wl_um, table[0], table[1])
+    return float(n) if np.ndim(n) == 0 else n
+
+def get_refractive_index(name, wl_um):
+    return refractive_index(MATERIALS_DB[name], wl_um)
+
+def cladding_index(props):
+    # Cladding approximation (Air or SiO2), chosen from the 1550nm index
+    return 1.444 if props["n"] > 1.45 else 1.0
+
 def get_material_names():
     return list(MATERIALS_DB.keys())
 
 def get_properties(name):
-    return MATERIALS_DB.get(name, None)
\ No newline at end of file
+    return MATERIALS_DB.get(name, None)
+
+def get_name(props):
+    return next((k for k, v in MATERIALS_DB.items() if v is props), None)
\ No newline at end of file
@@ -0,0 +1,183 @@
+# mode_solver.py
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+import materials
+
+# Finite-difference slab mode solver
+# The waveguide is treated as a 1D slab across its width (the in-plane
+# cross-section seen by the 2D FDTD). Polarization follows the FDTD naming:
+#   TM: Ez normal to the chip plane, tangential to the side walls (scalar operator)
+#   TE: Hz normal to the chip plane, E crosses the walls (1/n^2 weighted operator)
+# Both reduce to a symmetric tridiagonal eigenproblem for beta^2.
+
+SOLVER_VERSION = 1       # bump when the operators or the slab window change
+GRID_POINTS = 400        # FD points across the slab window
+TABLE_WL_POINTS = 32     # wavelength samples per cached n_eff row
+DEFAULT_WIDTH_UM = 2.0
+WIDTH_GRID = np.geomspace(0.25, 32.0, 24)   # widths solved for width sweeps (um)
+
+CACHE_DIR = os.environ.get("PYWAVEGUIDE_CACHE", os.path.join(os.path.expanduser("~"), ".pywaveguide"))
+TABLE_FILE = "mode_table.npz"
+
+def _slab_window(n_core, n_clad, width_um, wl_um, points):
+    # Pad with enough cladding for the evanescent tail to decay (~6/gamma)
+    k0 = 2 * np.pi / wl_um
+    NA = np.sqrt(max(n_core**2 - n_clad**2, 1e-6))
+    pad = max(wl_um, 6.0 / (k0 * NA))
+    x = np.linspace(-width_um / 2 - pad, width_um / 2 + pad, points)
+    n = np.where(np.abs(x) <= width_um / 2, n_core, n_clad)
+    return x, n
+
+def _tridiagonal(x, n, wl_um, polarization):
+    """ Returns (diag, offdiag, scale) of the symmetric operator for beta^2 """
+    dx = x[1] - x[0]
+    k0 = 2 * np.pi / wl_um
+    eps = n ** 2
+    if polarization == "TM":
+        diag = -2.0 / dx**2 + k0**2 * eps
+        off = np.full(len(x) - 1, 1.0 / dx**2)
+        return diag, off, np.ones_like(x)
+    # TE: d/dx(1/eps dH/dx) + k0^2 H = beta^2 (1/eps) H, symmetrized with B^-1/2
+    a = 2.0 / (eps[1:] + eps[:-1])            # 1/eps at the half nodes
+    a_left = np.concatenate(([1.0 / eps[0]], a))
+    a_right = np.concatenate((a, [1.0 / eps[-1]]))
+    b = 1.0 / eps
+    diag = (-(a_left + a_right) / dx**2 + k0**2) / b
+    off = (a / dx**2) / np.sqrt(b[1:] * b[:-1])
+    return diag, off, np.sqrt(b)
+
+def _eig_dense(diag, off, vectors):
+    # Assembled as a dense matrix: at GRID_POINTS = 400 LAPACK eigh is cheap
+    A = np.diag(diag) + np.diag(off, 1) + np.diag(off, -1)
+    if vectors:
+        return np.linalg.eigh(A)
+    return np.linalg.eigvalsh(A), None
+
+def solve_slab(n_core, n_clad, width_um, wl_um, polarization="TM", num_modes=1, points=GRID_POINTS, profiles=True):
+    """ Guided modes of a symmetric slab.
+    Returns (n_eff, x_um, fields), modes sorted from the fundamental;
+    fields is None when profiles=False. """
+    x, n = _slab_window(n_core, n_clad, width_um, wl_um, points)
+    diag, off, scale = _tridiagonal(x, n, wl_um, polarization)
+    vals, vecs = _eig_dense(diag, off, profiles)
+
+    k0 = 2 * np.pi / wl_um
+    order = np.argsort(vals)[::-1][:num_modes]
+    n_eff = np.sqrt(np.clip(vals[order], 0, None)) / k0
+    guided = n_eff > n_clad
+    if not guided.any():
+        guided[0] = True   # the fundamental of a symmetric slab has no cut-off
+    n_eff = n_eff[guided]
+
+    if not profiles:
+        return n_eff, x, None
+    fields = (vecs[:, order[guided]] / scale[:, None]).T
+    # Normalize to a positive unit peak
+    peak = fields[np.arange(len(fields)), np.argmax(np.abs(fields), axis=1)]
+    fields /= peak[:, None]
+    return n_eff, x, fields
+
+def _table_version():
+    # Solver settings plus the material data the rows are solved from; a
+    # stored table with a different version is discarded on load
+    data = {name: {k: v for k, v in props.items() if k not in ("n_table", "description")}
+            for name, props in materials.MATERIALS_DB.items()}
+    blob = json.dumps({"solver": SOLVER_VERSION, "points": GRID_POINTS, "wl_points": TABLE_WL_POINTS,
+                       "materials": data}, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+TABLE_VERSION = _table_version()
+
+class ModeTable:
+    """ Persistent n_eff(wl) rows keyed by material, polarization and width.
+    Each row is solved once over the material's transparency range and then
+    linearly interpolated, so repeated sweeps cost a table lookup. The file
+    carries TABLE_VERSION and is rebuilt when the solver or materials change. """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(CACHE_DIR, TABLE_FILE)
+        self._rows = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def _key(props, width_um, polarization):
+        name = materials.get_name(props) or f"n={props['n']}"
+        return f"{name}|{polarization}|{float(width_um):.3f}"
+
+    def _load(self):
+        try:
+            with np.load(self.path) as data:
+                if str(data["version"]) != TABLE_VERSION: return
+                for k, wl, n_eff in zip(data["keys"], data["wl"], data["n_eff"]):
+                    self._rows[str(k)] = (wl, n_eff)
+        except (OSError, KeyError, ValueError):
+            self._rows = {}
+
+    def save(self):
+        if not self._rows: return
+        keys = list(self._rows)
+        tmp = self.path + ".tmp.npz"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            np.savez(tmp, version=np.array(TABLE_VERSION), keys=np.array(keys),
+                     wl=np.stack([self._rows[k][0] for k in keys]),
+                     n_eff=np.stack([self._rows[k][1] for k in keys]))
+            os.replace(tmp, self.path)
+        except OSError:
+            pass  # the table is a cache, a read-only home just means no persistence
+
+    def _solve_row(self, props, width_um, polarization):
+        wl = np.linspace(props["min_wl"], props["max_wl"], TABLE_WL_POINTS)
+        n_core = materials.refractive_index(props, wl)
+        n_clad = materials.cladding_index(props)
+        n_eff = np.array([solve_slab(nc, n_clad, width_um, w, polarization, profiles=False)[0][0]
+                          for nc, w in zip(n_core, wl)])
+        return wl, n_eff
+
+    def lookup(self, props, width_um, wl_um, polarization="TM"):
+        key = self._key(props, width_um, polarization)
+        row = self._rows.get(key)
+        if row is None:
+            row = self._solve_row(props, width_um, polarization)
+            with self._lock:
+                self._rows[key] = row
+                self.save()
+        n = np.interp(wl_um, row[0], row[1])
+        return float(n) if np.ndim(n) == 0 else n
+
+_table = None
+
+def get_table():
+    global _table
+    if _table is None:
+        _table = ModeTable()
+    return _table
+
+def effective_index(props, width_um, wl_um, polarization="TM"):
+    return get_table().lookup(props, width_um, wl_um, polarization)
+
+def mode_profile(props, width_um, wl_um, polarization="TM", num_modes=1):
+    """ Solved field profiles across the guide (x in um, centred on the axis) """
+    n_core = materials.refractive_index(props, wl_um)
+    n_eff, x, fields = solve_slab(n_core, materials.cladding_index(props), width_um, wl_um,
+                                  polarization, num_modes)
+    return n_eff, x, fields
+
+_width_rows = {}
+
+def effective_index_widths(props, widths, wl_um, polarization="TM"):
+    """ Fundamental n_eff for an array of widths at one wavelength.
+    Solved once per session on WIDTH_GRID, then interpolated in log(width). """
+    key = (materials.get_name(props) or props["n"], polarization, round(float(wl_um), 6))
+    row = _width_rows.get(key)
+    if row is None:
+        n_core = materials.refractive_index(props, wl_um)
+        n_clad = materials.cladding_index(props)
+        row = np.array([solve_slab(n_core, n_clad, w, wl_um, polarization, profiles=False)[0][0]
+                        for w in WIDTH_GRID])
+        _width_rows[key] = row
+    return np.interp(np.log(widths), np.log(WIDTH_GRID), row)
\ No newline at end of file
@@ -1,21 +1,28 @@
 # optimizer.py
+import numpy as np
 import materials
 import waveguide_models as wm
+import mode_solver
+import result_store
 
-def _create_component(comp_type, mat_name, wl):
+# Bump whenever the analytical models change (invalidates stored datasheets)
+MODEL_VERSION = 1
+
+def _create_component(comp_type, mat_name, wl, pol="TM"):
     props = materials.get_properties(mat_name)
     if not props: return None
     
-    if comp_type == "Straight Guide": return wm.StraightWaveguide(props, wl)
-    elif comp_type == "S-Bend": return wm.SBendWaveguide(props, wl)
-    elif comp_type == "Y-Branch": return wm.YBranch(props, wl)
-    elif comp_type == "MMI (Splitter)": return wm.MMI(props, wl)
-    elif comp_type == "Mirror": return wm.Mirror(props, wl)
-    elif comp_type == "Grating (Bragg)": return wm.Grating(props, wl)
+    if comp_type == "Straight Guide": return wm.StraightWaveguide(props, wl, pol)
+    elif comp_type == "S-Bend": return wm.SBendWaveguide(props, wl, pol)
+    elif comp_type == "Y-Branch": return wm.YBranch(props, wl, pol)
+    elif comp_type == "MMI (Splitter)": return wm.MMI(props, wl, pol)
+    elif comp_type == "Mirror": return wm.Mirror(props, wl, pol)
+    elif comp_type == "Grating (Bragg)": return wm.Grating(props, wl, pol)
     return None
 
 def run_simulation(params):
-    comp = _create_component(params['type'], params['material'], float(params.get('wl', 1.55)))
+    comp = _create_component(params['type'], params['material'], float(params.get('wl', 1.55)),
+                             params.get('polarization', 'TM'))
     if not comp: return {"Error": "Unknown Component"}
     
     if params['type'] == "Straight Guide":
@@ -33,18 +40,40 @@ def run_simulation(params):
     
     return {}
 
-def generate_comparative_datasheet(params):
+def _datasheet_key(params, mat_names):
+    # The datasheet sweeps every material and its own wavelengths
+    fixed = {k: v for k, v in params.items() if k not in ('material', 'wl', 'view_mode')}
+    return result_store.make_key({"kind": "datasheet", "model": MODEL_VERSION, "modes": mode_solver.TABLE_VERSION,
+                                  "materials": mat_names, "params": fixed})
+
+def generate_comparative_datasheet(params, progress=None, store=None):
+    """ Transmittance of every material across the visible range.
+    With a result_store.ResultStore, known parameter sets are a cache read. """
     mat_names = materials.get_material_names()
+    if store:
+        key = _datasheet_key(params, mat_names)
+        cached = store.get(key)
+        if cached:
+            arrays, _ = cached
+            rows = []
+            for wl, vals in zip(arrays["wavelength"], arrays["transmittance"]):
+                row = {"Wavelength (um)": f"{wl:.2f}"}
+                row.update({m: ("N/A" if np.isnan(v) else float(v)) for m, v in zip(mat_names, vals)})
+                rows.append(row)
+            return mat_names, rows
+
     start_wl = 0.38
     end_wl = 0.78
     step = 0.02
     spectral_rows = []
+    n_rows = int(round((end_wl - start_wl) / step)) + 1
     
     curr_wl = start_wl
     while curr_wl <= end_wl + 0.001:
+        if progress: progress(len(spectral_rows), n_rows)
         row = {"Wavelength (um)": f"{curr_wl:.2f}"}
         for mat in mat_names:
-            comp = _create_component(params['type'], mat, curr_wl)
+            comp = _create_component(params['type'], mat, curr_wl, params.get('polarization', 'TM'))
             if comp:
                 val = comp.analyze_spectrum(params, curr_wl)
                 row[mat] = val
@@ -52,5 +81,135 @@ def generate_comparative_datasheet(params):
                 row[mat] = "N/A"
         spectral_rows.append(row)
         curr_wl += step
+
+    if store:
+        table = [[np.nan if r[m] == "N/A" else r[m] for m in mat_names] for r in spectral_rows]
+        try:
+            store.put(key, {"wavelength": [float(r["Wavelength (um)"]) for r in spectral_rows],
+                            "transmittance": table},
+                      {"materials": mat_names, "params": params}, kind="datasheet", type=params['type'],
+                      polarization=params.get('polarization', ''))
+        except result_store.STORE_ERRORS:
+            pass  # the datasheet is still returned uncached
         
-    return mat_names, spectral_rows
\ No newline at end of file
+    return mat_names, spectral_rows
+
+# --- Multi-objective design search ---
+# Genes live in [0, 1]: continuous parameters map linearly (geometrically when
+# the range spans more than a decade), integer ones are rounded, and the
+# material is a categorical gene. Variation is DE/rand/1/bin, survival is
+# NSGA-II (non-dominated rank, then crowding distance). A generation is
+# scored with one vectorized Component.evaluate() call per material.
+
+SEARCH_SPACE = {
+    "Straight Guide": {"len_um": (100.0, 20000.0), "width_um": (0.5, 4.0)},
+    "S-Bend": {"len_um": (20.0, 2000.0)},
+    "Y-Branch": {"angle_deg": (0.2, 10.0), "len_um": (20.0, 1000.0)},
+    "MMI (Splitter)": {"width_um": (2.0, 20.0)},
+    "Grating (Bragg)": {"periods": (10, 2000), "width_um": (0.5, 4.0)},
+}
+DESIGN_PARAMS = ("len_um", "width_um", "offset_um", "angle_deg", "ports", "periods", "target_wl")
+INTEGER_PARAMS = ("ports", "periods")
+POP_SIZE = 200
+GENERATIONS = 60
+DE_F = 0.6
+DE_CR = 0.8
+MATERIAL_MUTATION = 0.1
+
+def _decode(genes, bounds):
+    x = {}
+    for j, (name, (lo, hi)) in enumerate(bounds.items()):
+        g = genes[:, j]
+        v = lo * (hi / lo) ** g if lo > 0 and hi / lo > 10 else lo + (hi - lo) * g
+        x[name] = np.round(v) if name in INTEGER_PARAMS else v
+    return x
+
+def evaluate_population(params, x, mat_idx, mat_names):
+    """ Objective matrix (n, 3), all minimized: -transmittance, footprint, cost """
+    n = len(mat_idx)
+    fixed = {k: np.full(n, float(params[k])) for k in DESIGN_PARAMS if k in params and k not in x}
+    x = dict(fixed, **x)
+    F = np.zeros((n, 3))
+    wl, pol = float(params.get('wl', 1.55)), params.get('polarization', 'TM')
+    for m, mat in enumerate(mat_names):
+        sel = mat_idx == m
+        if not sel.any(): continue
+        res = _create_component(params['type'], mat, wl, pol).evaluate({k: v[sel] for k, v in x.items()})
+        F[sel] = np.column_stack([-res["transmittance"], res["footprint_um2"], res["cost"]])
+    return F
+
+def pareto_ranks(F):
+    """ Non-dominated front index of every row of F (0 = Pareto optimal) """
+    dominates = (F[:, None] <= F[None]).all(-1) & (F[:, None] < F[None]).any(-1)
+    count = dominates.sum(0)
+    rank = np.full(len(F), -1)
+    front = 0
+    while (rank < 0).any():
+        current = (count == 0) & (rank < 0)
+        rank[current] = front
+        count = count - dominates[current].sum(0)
+        front += 1
+    return rank
+
+def crowding_distance(F, rank):
+    dist = np.zeros(len(F))
+    for r in np.unique(rank):
+        idx = np.nonzero(rank == r)[0]
+        for k in range(F.shape[1]):
+            order = idx[np.argsort(F[idx, k])]
+            span = F[order[-1], k] - F[order[0], k]
+            dist[order[[0, -1]]] = np.inf
+            if len(order) > 2 and span > 0:
+                dist[order[1:-1]] += (F[order[2:], k] - F[order[:-2], k]) / span
+    return dist
+
+def optimize_pareto(params, bounds=None, mat_names=None, pop_size=POP_SIZE, generations=GENERATIONS,
+                    seed=None, progress=None):
+    """ Pareto front of transmittance vs footprint vs cost for params['type'].
+    bounds maps free parameters to (lo, hi), defaulting to SEARCH_SPACE; the
+    remaining design parameters are held at their params values. Returns
+    rows sorted by transmittance, best first. """
+    if params['type'] not in SEARCH_SPACE:
+        raise ValueError(f"No search space defined for {params['type']}")
+    bounds = dict(SEARCH_SPACE.get(params['type'], {}) if bounds is None else bounds)
+    mat_names = list(mat_names or materials.get_material_names())
+    rng = np.random.default_rng(seed)
+    n, d = pop_size, len(bounds)
+
+    genes = rng.random((n, d))
+    mats = rng.integers(len(mat_names), size=n)
+    F = evaluate_population(params, _decode(genes, bounds), mats, mat_names)
+    for gen in range(generations):
+        if progress: progress(gen, generations)
+        # DE/rand/1/bin on the continuous genes, inherit-or-reset on the material
+        r = rng.integers(n, size=(n, 3))
+        mutant = np.clip(genes[r[:, 0]] + DE_F * (genes[r[:, 1]] - genes[r[:, 2]]), 0.0, 1.0)
+        cross = rng.random((n, d)) < DE_CR
+        if d: cross[np.arange(n), rng.integers(d, size=n)] = True
+        trial = np.where(cross, mutant, genes)
+        trial_mats = np.where(rng.random(n) < DE_CR, mats[r[:, 0]], mats)
+        reset = rng.random(n) < MATERIAL_MUTATION
+        trial_mats[reset] = rng.integers(len(mat_names), size=reset.sum())
+        trial_F = evaluate_population(params, _decode(trial, bounds), trial_mats, mat_names)
+
+        # NSGA-II survival over parents + trials
+        genes, mats = np.vstack([genes, trial]), np.concatenate([mats, trial_mats])
+        F = np.vstack([F, trial_F])
+        rank = pareto_ranks(F)
+        keep = np.lexsort((-crowding_distance(F, rank), rank))[:n]
+        genes, mats, F = genes[keep], mats[keep], F[keep]
+
+    front = pareto_ranks(F) == 0
+    x = _decode(genes[front], bounds)
+    rows, seen = [], set()
+    for i in np.argsort(F[front, 0]):
+        row = {"Material": mat_names[mats[front][i]]}
+        row.update({k: round(float(v[i]), 3) for k, v in x.items()})
+        row["Transmittance (%)"] = round(float(-F[front][i, 0]) * 100, 2)
+        row["Footprint (um^2)"] = round(float(F[front][i, 1]), 1)
+        row["Cost ($)"] = round(float(F[front][i, 2]), 2)
+        sig = tuple(row.values())
+        if sig not in seen:
+            seen.add(sig)
+            rows.append(row)
+    return rows
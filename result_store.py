@@ -0,0 +1,124 @@
+# result_store.py
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import data_export
+
+# Content-addressed on-disk store for simulation results
+# key    = sha256 of the canonical JSON of everything that determines a result
+#          (component params, grid, steps, engine/model version, ...)
+# blobs  = one uncompressed .npz per result (traces, spectra, field snapshot)
+# index  = SQLite table for lookups/queries and LRU eviction by total size
+
+CACHE_DIR = os.environ.get("PYWAVEGUIDE_CACHE", os.path.join(os.path.expanduser("~"), ".pywaveguide"))
+STORE_DIR = "results"
+MAX_BYTES = 256 * 1024 * 1024
+# What a full, read-only or locked cache can raise; callers treat the cache
+# as optional and carry on without it
+STORE_ERRORS = (OSError, sqlite3.Error)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    kind TEXT, type TEXT, material TEXT, polarization TEXT,
+    created REAL, accessed REAL, size INTEGER, meta TEXT
+)"""
+
+def make_key(key_params):
+    blob = json.dumps(key_params, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+class ResultStore:
+    def __init__(self, root=None, max_bytes=MAX_BYTES):
+        self.root = root or os.path.join(CACHE_DIR, STORE_DIR)
+        self.max_bytes = max_bytes
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(self.root, "index.sqlite"), check_same_thread=False)
+        self._db.execute(_SCHEMA)
+        self._db.commit()
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + ".npz")
+
+    def get(self, key):
+        """ (arrays, metadata) for a stored key, or None """
+        with self._lock:
+            row = self._db.execute("SELECT key FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None: return None
+            try:
+                arrays, meta = data_export.load_npz(self._path(key))
+            except (OSError, ValueError, KeyError):
+                self._forget(key)  # blob vanished or is corrupt
+                return None
+            self._db.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            return arrays, meta
+
+    def put(self, key, arrays, metadata, kind="", type="", material="", polarization=""):
+        path = self._path(key)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path[:-len(".npz")] + ".tmp.npz"
+            data_export.export_npz(tmp, arrays, metadata)
+            os.replace(tmp, path)
+            now = time.time()
+            self._db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             (key, kind, type, material, polarization, now, now, os.path.getsize(path),
+                              json.dumps(metadata, default=str)))
+            self._db.commit()
+            self._evict()
+        return key
+
+    def query(self, **filters):
+        """ Index rows (newest first) matching column=value filters,
+        e.g. query(kind="fdtd", material="Si (Silicon-on-Insulator)") """
+        cols = ("kind", "type", "material", "polarization")
+        where = " AND ".join(f"{c} = ?" for c in filters if c in cols)
+        sql = "SELECT key, kind, type, material, polarization, created, accessed, size FROM results"
+        if where: sql += " WHERE " + where
+        with self._lock:
+            rows = self._db.execute(sql + " ORDER BY created DESC",
+                                    [v for c, v in filters.items() if c in cols]).fetchall()
+        names = ("key", "kind", "type", "material", "polarization", "created", "accessed", "size")
+        return [dict(zip(names, r)) for r in rows]
+
+    def total_bytes(self):
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def _forget(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+        self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+        self._db.commit()
+
+    def _evict(self):
+        # Least recently accessed first until the store fits the budget
+        total = self.total_bytes()
+        if total <= self.max_bytes: return
+        for key, size in self._db.execute("SELECT key, size FROM results ORDER BY accessed ASC").fetchall():
+            if total <= self.max_bytes: break
+            self._forget(key)
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            for (key,) in self._db.execute("SELECT key FROM results").fetchall():
+                self._forget(key)
+
+_store = None
+
+def get_store():
+    """ Shared store, or None when the cache directory is not writable """
+    global _store
+    if _store is None:
+        try:
+            _store = ResultStore()
+        except STORE_ERRORS:
+            return None
+    return _store
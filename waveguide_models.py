@@ -1,20 +1,31 @@
 # waveguide_models.py
 import math
+import numpy as np
+import materials
+import mode_solver
 
 class GenericComponent:
-    def __init__(self, material_props, wavelength_um=1.55):
+    def __init__(self, material_props, wavelength_um=1.55, polarization="TM"):
         self.props = material_props
         self.wl = float(wavelength_um)
-        self.n_core = self.props["n"]
+        self.polarization = polarization
+        self.n_core = materials.refractive_index(self.props, self.wl)
         # Cladding approximation (Air or SiO2)
-        self.n_clad = 1.444 if self.n_core > 1.45 else 1.0
-        self.n_eff = self.n_core * 0.95 
+        self.n_clad = materials.cladding_index(self.props)
         
         try:
             self.NA = math.sqrt(self.n_core**2 - self.n_clad**2)
         except:
             self.NA = 0.1
 
+    @property
+    def n_eff(self):
+        return self.effective_index(self.wl)
+
+    def effective_index(self, wl_um, width_um=mode_solver.DEFAULT_WIDTH_UM):
+        # Fundamental mode index from the cached FD mode solver table
+        return mode_solver.effective_index(self.props, width_um, wl_um, self.polarization)
+
     def is_transparent(self, wl_um):
         return self.props["min_wl"] <= wl_um <= self.props["max_wl"]
 
@@ -23,6 +34,19 @@ class GenericComponent:
         var = self.props["cost_factor"] * dimension_metric
         return round(base + var, 2)
     
+    def evaluate(self, x):
+        """ Vectorized design evaluation for the optimizer. x maps design
+        parameters to equal-length arrays; returns arrays of transmittance
+        (fraction, per output port), footprint (um^2) and cost ($). """
+        raise NotImplementedError
+
+    def _batch_cost(self, length_cm):
+        return self.props["cost_base"] + self.props["cost_factor"] * length_cm
+
+    def _batch(self, trans, footprint, cost):
+        if not self.is_transparent(self.wl): trans = np.zeros_like(trans)
+        return {"transmittance": trans, "footprint_um2": footprint, "cost": cost}
+
     def get_V_number(self, width_um, wl_um):
         return (2 * math.pi * (width_um/2) / wl_um) * self.NA
 
@@ -59,6 +83,12 @@ class StraightWaveguide(GenericComponent):
         trans = 10 ** (-loss / 10)
         return round(trans * 100, 2)
 
+    def evaluate(self, x):
+        L = x["len_um"]
+        W = x.get("width_um", mode_solver.DEFAULT_WIDTH_UM)
+        trans = 10 ** (-self.props["alpha"] * (L / 10000.0) / 10)
+        return self._batch(trans, L * W, self._batch_cost(L / 10000.0))
+
 # --- 2. S-BEND ---
 class SBendWaveguide(GenericComponent):
     def design(self, offset_um, length_um):
@@ -86,6 +116,15 @@ class SBendWaveguide(GenericComponent):
         if not self.is_transparent(wl): return 0.0
         return 95.0
 
+    def evaluate(self, x):
+        offset, L = x["offset_um"], x["len_um"]
+        W = x.get("width_um", mode_solver.DEFAULT_WIDTH_UM)
+        R_eff = np.where(offset == 0, 999999, L ** 2 / (4 * np.maximum(offset, 1e-12)))
+        R_critical = self.props["min_bend_radius"]
+        loss_bend_db = np.where(R_eff < R_critical, 0.5 * (R_critical / (R_eff + 0.1)) ** 2, 0.01)
+        total_loss = loss_bend_db + self.props["alpha"] * (L / 10000.0)
+        return self._batch(10 ** (-total_loss / 10), L * (offset + W), self._batch_cost(L / 10000.0))
+
 # --- 3. Y-BRANCH ---
 class YBranch(GenericComponent):
     def design(self, angle_deg, length_um):
@@ -104,12 +143,20 @@ class YBranch(GenericComponent):
         if not self.is_transparent(test_wl): return 0.0
         return 49.5
 
+    def evaluate(self, x):
+        angle, L = x["angle_deg"], x["len_um"]
+        W = x.get("width_um", mode_solver.DEFAULT_WIDTH_UM)
+        total_loss = 3.01 + 0.1 * angle ** 2
+        # Both arms fan out from the stem: 2*L*tan(angle) apart at the end
+        footprint = L * (2 * L * np.tan(np.radians(angle)) + 2 * W)
+        return self._batch(10 ** (-total_loss / 10), footprint, self._batch_cost(L / 10000.0))
+
 # --- 4. MMI (Splitter) ---
 class MMI(GenericComponent):
     def design(self, width_um, ports_out):
         if not self.is_transparent(self.wl): return {"Status": "OPAQUE", "Transmittance (%)": 0}
         
-        L_pi = (4 * self.n_eff * (width_um**2)) / (3 * self.wl)
+        L_pi = (4 * self.effective_index(self.wl, width_um) * (width_um**2)) / (3 * self.wl)
         L_opt = (3 * L_pi / 8) if ports_out == 2 else (L_pi / ports_out)
         
         loss_ideal = 10 * math.log10(ports_out)
@@ -125,14 +172,22 @@ class MMI(GenericComponent):
         if not self.is_transparent(test_wl): return 0.0
         W = float(fixed_params['width_um'])
         N = int(fixed_params['ports'])
-        L_pi_design = (4 * self.n_eff * (W**2)) / (3 * 1.55)
+        L_pi_design = (4 * self.effective_index(1.55, W) * (W**2)) / (3 * 1.55)
         L_dev_fixed = (3 * L_pi_design / 8) if N == 2 else (L_pi_design / N)
-        L_pi_new = (4 * self.n_eff * (W**2)) / (3 * test_wl)
+        L_pi_new = (4 * self.effective_index(test_wl, W) * (W**2)) / (3 * test_wl)
         L_opt_new = (3 * L_pi_new / 8) if N == 2 else (L_pi_new / N)
         ratio = L_dev_fixed / L_opt_new
         efficiency = math.sin( (math.pi/2) * ratio ) ** 2
         return round((1.0/N) * efficiency * 100, 2)
 
+    def evaluate(self, x):
+        W = x["width_um"]
+        N = x.get("ports", np.full_like(W, 2))
+        n_eff = mode_solver.effective_index_widths(self.props, W, self.wl, self.polarization)
+        L_pi = (4 * n_eff * W ** 2) / (3 * self.wl)
+        L_opt = np.where(N == 2, 3 * L_pi / 8, L_pi / N)
+        return self._batch(1.0 / N, L_opt * W, self._batch_cost(L_opt / 10000.0))
+
 # --- 5. MIRROR & 6. GRATING ---
 class Mirror(GenericComponent):
     def design(self, reflectivity):
@@ -144,4 +199,23 @@ class Grating(GenericComponent):
     def design(self, target_wl):
         period = (target_wl) / (2 * self.n_eff)
         return {"Period (nm)": round(period*1000, 1), "Bragg Wavelength": target_wl}
-    def analyze_spectrum(self, p, wl): return 0.0
\ No newline at end of file
+    def analyze_spectrum(self, p, wl): return 0.0
+
+    def evaluate(self, x):
+        # Figure of merit is the peak Bragg reflectance tanh^2(kappa*L) at the
+        # design wavelength target_wl (default self.wl); teeth widen the core by
+        # half, kappa = 2*dn_eff/lambda (as in circuit.py)
+        periods = np.asarray(x["periods"], dtype=float)
+        W = np.broadcast_to(x.get("width_um", mode_solver.DEFAULT_WIDTH_UM), periods.shape)
+        lam = np.broadcast_to(x.get("target_wl", self.wl), periods.shape)
+        n, n_tooth = np.zeros(periods.shape), np.zeros(periods.shape)
+        for wl in np.unique(lam):
+            sel = lam == wl
+            if not self.is_transparent(wl): continue
+            n[sel] = mode_solver.effective_index_widths(self.props, W[sel], wl, self.polarization)
+            n_tooth[sel] = mode_solver.effective_index_widths(self.props, 1.5 * W[sel], wl, self.polarization)
+        ok = n > 0   # opaque at its target wavelength
+        L = periods * np.where(ok, lam / (2 * np.where(ok, n, 1.0)), 0.0)
+        refl = np.tanh(2 * (n_tooth - n) / lam * L) ** 2 * 10 ** (-self.props["alpha"] * (L / 10000.0) / 10)
+        return {"transmittance": np.where(ok, refl, 0.0), "footprint_um2": L * 1.5 * W,
+                "cost": self._batch_cost(L / 10000.0)}
\ No newline at end of file